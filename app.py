@@ -1,8 +1,33 @@
+import os
+from dataclasses import asdict
+from typing import List, Optional, Tuple
+
+import numpy as np
 import pandas as pd
+import requests
 import streamlit as st
 
-from src.rpp import load_rpp_table, get_state_rpp
-from src.cost_model import Inputs, estimate_monthly_cost, recommend_income
+from src.rpp import (
+    RppIndex, build_rpp_index, extract_states, load_rpp_metros, load_rpp_table,
+)
+from src.rpp_refresh import RppRefresher
+from src.states import STATE_NAMES
+from src.cost_model import (
+    CATEGORIES, CostBreakdown, FrozenInputs, Inputs, RppComponents, cached_breakdown, recommend_income,
+)
+from src.ranking import rank_states
+from src.sensitivity import sensitivity
+from src.simulate import Spread, simulate
+from src.tax import has_tax_table, tax_state
+
+FILING_STATUS_LABELS = {
+    "single": "Single", "head_of_household": "Head of household", "married_joint": "Married filing jointly",
+}
+
+# Set to e.g. http://127.0.0.1:8080 to use a running estimator service instead of the in-process model
+API_URL = os.environ.get("ESTIMATOR_API_URL", "").rstrip("/")
+# Set to 1 to keep the BEA page revalidated in the background instead of using the bundled dataset only
+LIVE_RPP = os.environ.get("RPP_LIVE_REFRESH") == "1"
 
 st.set_page_config(page_title="Cost of Living Estimator", layout="wide")
 
@@ -10,41 +35,32 @@ st.title("Lifestyle-Based Cost of Living Estimator")
 st.caption("V1: United States (state-level) using BEA Regional Price Parities (RPP).")
 
 # ---------- Load RPP + derive states list ----------
-rpp_df = load_rpp_table()
-
-# Try to get a robust state list from the scraped table; fallback list if needed
-def _extract_states(df: pd.DataFrame) -> list[str]:
-    cols = {c.lower(): c for c in df.columns}
-    state_col = None
-    for k in cols:
-        if "state" in k:
-            state_col = cols[k]
-            break
-    if state_col is None:
-        return []
-    states = (
-        df[state_col]
-        .dropna()
-        .astype(str)
-        .str.strip()
-        .unique()
-        .tolist()
-    )
-    # Keep only plausible names
-    states = [s for s in states if len(s) >= 4 and s.lower() not in ("state",)]
-    return sorted(set(states))
-
-STATE_OPTIONS = _extract_states(rpp_df)
-if not STATE_OPTIONS:
-    STATE_OPTIONS = [
-        "Alabama","Alaska","Arizona","Arkansas","California","Colorado","Connecticut","Delaware",
-        "District of Columbia","Florida","Georgia","Hawaii","Idaho","Illinois","Indiana","Iowa",
-        "Kansas","Kentucky","Louisiana","Maine","Maryland","Massachusetts","Michigan","Minnesota",
-        "Mississippi","Missouri","Montana","Nebraska","Nevada","New Hampshire","New Jersey","New Mexico",
-        "New York","North Carolina","North Dakota","Ohio","Oklahoma","Oregon","Pennsylvania","Rhode Island",
-        "South Carolina","South Dakota","Tennessee","Texas","Utah","Vermont","Virginia","Washington",
-        "West Virginia","Wisconsin","Wyoming"
-    ]
+# cache_resource, not cache_data: reruns share one table instead of unpickling a copy each time
+@st.cache_resource(ttl=24 * 3600)
+def _load_rpp_table() -> pd.DataFrame:
+    return load_rpp_table()
+
+@st.cache_resource
+def _rpp_refresher() -> RppRefresher:
+    # One refresher per process; sessions read its current table and never wait on BEA
+    refresher = RppRefresher()
+    refresher.start_background()
+    return refresher
+
+rpp_df = _rpp_refresher().table if LIVE_RPP else _load_rpp_table()
+
+@st.cache_resource
+def _rpp_data(version: str, _df: pd.DataFrame) -> Tuple[RppIndex, List[str]]:
+    """Index and state list, built once per RPP version for all sessions (_df is not hashed)."""
+    # Metro RPPs only come from the bundled dataset
+    index = build_rpp_index(_df, load_rpp_metros())
+    # Try to get a robust state list from the RPP table; fallback list if needed
+    return index, extract_states(_df) or list(STATE_NAMES)
+
+rpp_version = rpp_df.attrs.get("version", "unknown")
+rpp_lookup, STATE_OPTIONS = _rpp_data(rpp_version, rpp_df)
+
+STATEWIDE = "(Statewide)"
 
 # ---------- Sidebar inputs ----------
 with st.sidebar:
@@ -52,6 +68,11 @@ with st.sidebar:
     country = st.selectbox("Country", ["United States", "Other (coming soon)"])
     default_state = "New Jersey" if "New Jersey" in STATE_OPTIONS else STATE_OPTIONS[0]
     state = st.selectbox("State", STATE_OPTIONS, index=STATE_OPTIONS.index(default_state))
+    metro_options = rpp_lookup.metros_in_state(state)
+    metro = None
+    if metro_options:
+        metro = st.selectbox("Metro area", [STATEWIDE, *metro_options])
+        metro = None if metro == STATEWIDE else metro
 
     st.header("Household")
     adults = st.number_input("Adults", min_value=1, max_value=6, value=1, step=1)
@@ -76,12 +97,145 @@ with st.sidebar:
     entertainment = st.selectbox("Entertainment", ["Low", "Medium", "High"], index=1)
     travel = st.selectbox("Travel", ["None", "Occasional", "Frequent"], index=0)
 
-    st.header("Income planning")
-    savings_rate = st.slider("Savings rate target (%)", min_value=0, max_value=40, value=15, step=1)
-    effective_tax_rate = st.slider("Estimated effective tax rate (%)", min_value=0, max_value=40, value=22, step=1)
-    include_buffer = st.checkbox("Add contingency buffer (5%)", value=True)
+    st.divider()
+    live = st.toggle("Live updates", value=True, help="Recompute on every change instead of waiting for the button.")
+
+submitted = live or st.button("Estimate cost")
+
+# ---------- Results ----------
+# The estimate itself goes through cached_breakdown's LRU; the derived panels are cached per (household, RPP)
+@st.cache_data(max_entries=64, show_spinner="Simulating...")
+def _bands(inp: FrozenInputs, rpp: RppComponents, spread_pct: int) -> pd.DataFrame:
+    return simulate(inp, rpp, n=200_000, default=Spread("lognormal", spread_pct / 100.0), seed=0)
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _tornado(inp: FrozenInputs, rpp: RppComponents) -> pd.DataFrame:
+    return sensitivity(inp, rpp).head(10)
+
+@st.fragment
+def result_panel(inp: FrozenInputs, rpp: RppComponents, metro: Optional[str]) -> None:
+    """
+    Everything below the inputs. Its own controls (income planning, uncertainty)
+    rerun only this fragment, not the sidebar and data setup above.
+    """
+    c1, c2, c3 = st.columns(3)
+    savings_rate = c1.slider("Savings rate target (%)", min_value=0, max_value=40, value=15, step=1)
+    filing_status = c2.selectbox(
+        "Tax filing status", list(FILING_STATUS_LABELS), format_func=FILING_STATUS_LABELS.get,
+        index=2 if inp.adults > 1 else (1 if inp.kids else 0),
+    )
+    include_buffer = c3.checkbox("Add contingency buffer (5%)", value=True)
+    show_bands = c3.checkbox("Show p10/p50/p90 bands (Monte Carlo)", value=False)
+
+    income_options = dict(
+        savings_rate=savings_rate / 100.0,
+        buffer=0.05 if include_buffer else 0.0,
+        filing_status=filing_status,
+    )
+
+    if API_URL:
+        # Optional: delegate to the headless service (python -m src.server)
+        try:
+            resp = requests.post(
+                f"{API_URL}/estimate",
+                json={"household": {**asdict(inp), "metro": metro}, **income_options},
+                timeout=10,
+            )
+            resp.raise_for_status()
+        except requests.RequestException as e:
+            st.error(f"Estimator service at {API_URL} failed. Details: {e}")
+            return
+        payload = resp.json()
+        monthly, income = CostBreakdown.from_dict(payload["monthly"]), payload["income"]
+    else:
+        monthly = cached_breakdown(inp, rpp)
+        # Income recommendation
+        income = recommend_income(monthly_cost=monthly.total, state=tax_state(inp.state), **income_options)
+
+    # Breakdown table (excluding Total)
+    category_values = np.array(monthly[:-1])
+    df = pd.DataFrame({
+        "Category": CATEGORIES,
+        "Monthly (USD)": category_values,
+        "Annual (USD)": category_values * 12,
+    })
+
+    total_monthly = monthly.total
+    total_annual = total_monthly * 12
+    tab_estimate, tab_states = st.tabs(["Estimate", "Compare states"])
+
+    with tab_estimate:
+        col1, col2 = st.columns([2, 1])
+
+        with col1:
+            st.subheader("Cost breakdown")
+            st.dataframe(
+                df.style.format({"Monthly (USD)": "{:,.0f}", "Annual (USD)": "{:,.0f}"}),
+                use_container_width=True
+            )
+
+        with col2:
+            st.subheader("Summary")
+            st.metric(f"{'Metro' if metro else 'State'} price level (RPP index)", f"{rpp.all_items:,.1f}")
+            st.caption(
+                f"Goods {rpp.goods:,.1f} · Housing {rpp.housing:,.1f} · "
+                f"Utilities {rpp.utilities:,.1f} · Other services {rpp.other:,.1f}"
+            )
+            st.metric("Estimated monthly total", f"${total_monthly:,.0f}")
+            st.metric("Estimated annual total", f"${total_annual:,.0f}")
 
-submitted = st.button("Estimate cost")
+            st.divider()
+            st.subheader("Income recommendation")
+            st.caption(
+                f"Based on your savings target and {inp.state} + federal income and payroll taxes."
+                if has_tax_table(inp.state) else
+                "Based on your savings target and federal income and payroll taxes (no state tax applied)."
+            )
+            st.metric("Gross monthly needed", f"${income['gross_monthly']:,.0f}")
+            st.metric("Gross annual needed", f"${income['gross_annual']:,.0f}")
+            st.caption(
+                f"Assumptions: savings {savings_rate}%, {FILING_STATUS_LABELS[filing_status].lower()} "
+                f"(effective tax {income['effective_tax_rate']:.1%}), "
+                + ("+ 5% buffer." if include_buffer else "no buffer.")
+            )
+
+        st.subheader("What moves your total")
+        tornado = _tornado(inp, rpp)
+        tornado.index = [p if k == "input" else f"{p} ({k} ±10%)" for p, k in zip(tornado["parameter"], tornado["kind"])]
+        st.caption("Change in the monthly total from switching each choice, or moving each assumption by ±10%.")
+        st.bar_chart(tornado[["low", "high"]], horizontal=True)
+        st.dataframe(
+            tornado[["low_value", "low", "high_value", "high"]].style.format({"low": "{:+,.0f}", "high": "{:+,.0f}"}),
+            use_container_width=True,
+        )
+
+        if show_bands:
+            st.subheader("Uncertainty bands")
+            spread_pct = st.slider("Assumption spread (%)", min_value=1, max_value=40, value=10, step=1)
+            bands = _bands(inp, rpp, spread_pct)
+            st.caption(
+                f"200,000 draws with every basket value, lifestyle multiplier and scaling constant "
+                f"varied by ~{spread_pct}% (lognormal)."
+            )
+            st.dataframe(bands.style.format("{:,.0f}"), use_container_width=True)
+
+    with tab_states:
+        st.subheader("Cheapest states for this lifestyle")
+        ranking = rank_states(inp, rpp_lookup, income_options)
+        ranking["vs. yours"] = ranking["Total"] - total_monthly
+        st.caption(
+            f"Monthly totals for this household in every state; \"vs. yours\" compares with your "
+            f"{metro or inp.state} estimate of ${total_monthly:,.0f}."
+        )
+        st.dataframe(
+            ranking[["rank", "state", "rpp", "Total", "vs. yours", "Gross annual needed"]]
+            .set_index("rank")
+            .style.format(
+                {"rpp": "{:,.1f}", "Total": "${:,.0f}", "vs. yours": "{:+,.0f}", "Gross annual needed": "${:,.0f}"},
+                na_rep="–",
+            ),
+            use_container_width=True,
+        )
 
 # ---------- Main ----------
 if country != "United States":
@@ -90,7 +244,10 @@ if country != "United States":
 
 if submitted:
     try:
-        rpp_index = get_state_rpp(rpp_df, state)
+        if metro:
+            rpp, _ = rpp_lookup.resolve_components(state, metro)
+        else:
+            rpp = rpp_lookup.components(state)
     except Exception as e:
         st.error(f"Could not resolve RPP for '{state}'. Details: {e}")
         st.stop()
@@ -110,53 +267,16 @@ if submitted:
         gym=gym,
         entertainment=entertainment,
         travel=travel,
-    )
-
-    monthly = estimate_monthly_cost(inp, rpp_index)
-
-    # Breakdown table (excluding Total)
-    df = pd.DataFrame(
-        [{"Category": k, "Monthly (USD)": v, "Annual (USD)": v * 12}
-         for k, v in monthly.items() if k != "Total"]
-    )
+    ).freeze()
 
-    total_monthly = monthly["Total"]
-    total_annual = total_monthly * 12
+    result_panel(inp, rpp, metro)
 
-    # Income recommendation
-    income = recommend_income(
-        monthly_cost=total_monthly,
-        savings_rate=savings_rate / 100.0,
-        effective_tax_rate=effective_tax_rate / 100.0,
-        buffer=0.05 if include_buffer else 0.0,
-    )
-
-    col1, col2 = st.columns([2, 1])
+if rpp_version == "fallback":
+    st.warning("BEA RPP data is unavailable; using a small built-in fallback table. Run `python -m src.rpp_ingest` to bundle the full dataset.")
+else:
+    st.caption(f"RPP data version: {rpp_version}")
 
-    with col1:
-        st.subheader("Cost breakdown")
-        st.dataframe(
-            df.style.format({"Monthly (USD)": "{:,.0f}", "Annual (USD)": "{:,.0f}"}),
-            use_container_width=True
-        )
-
-    with col2:
-        st.subheader("Summary")
-        st.metric("State price level (RPP index)", f"{rpp_index:,.1f}")
-        st.metric("Estimated monthly total", f"${total_monthly:,.0f}")
-        st.metric("Estimated annual total", f"${total_annual:,.0f}")
-
-        st.divider()
-        st.subheader("Income recommendation")
-        st.caption("Based on your savings + tax assumptions.")
-        st.metric("Gross monthly needed", f"${income['gross_monthly']:,.0f}")
-        st.metric("Gross annual needed", f"${income['gross_annual']:,.0f}")
-        st.caption(
-            f"Assumptions: savings {savings_rate}%, effective tax {effective_tax_rate}%, "
-            + ("+ 5% buffer." if include_buffer else "no buffer.")
-        )
-
-    st.caption(
-        "Note: This is an estimator using state-level price parity (BEA RPP) and configurable lifestyle assumptions; "
-        "it is not a quote for rent, insurance, or taxes."
-    )
+st.caption(
+    "Note: This is an estimator using state-level price parity (BEA RPP) and configurable lifestyle assumptions; "
+    "it is not a quote for rent, insurance, or taxes."
+)
@@ -0,0 +1,201 @@
+"""
+Benchmarks for the estimator hot paths.
+
+    python -m benchmarks.run                       # run everything, write bench_results.json
+    python -m benchmarks.run --filter batch        # only scenarios whose name contains "batch"
+    python -m benchmarks.run --save-baseline       # store this run as benchmarks/baseline.json
+
+When a baseline exists, any scenario slower than baseline * (1 + --threshold)
+is reported as a regression and the command exits with status 1.
+"""
+from __future__ import annotations
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+from typing import Callable, Dict
+
+import numpy as np
+import pandas as pd
+
+from src.affordability import affordable_lifestyles
+from src.batch import estimate_batch, recommend_income_batch
+from src.cost_model import (
+    LEVELS, Inputs, estimate_monthly_cost, invalidate_basket_cache,
+    load_base_basket, multipliers, recommend_income,
+)
+from src.linear import compile_linear_model, linear_model
+from src.ranking import rank_states, state_totals
+from src.rpp import build_rpp_index, extract_states, get_state_rpp, load_rpp_table, parse_rpp_html
+from src.rpp_ingest import read_bea_html, write_dataset
+from src.score import score_file
+from src.sensitivity import sensitivity
+from src.simulate import simulate
+from src.states import STATES
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+
+SAMPLE = Inputs(
+    state="New Jersey", adults=2, kids=1, housing_mode="Rent", bedrooms="2BR",
+    premium_area=False, cars=1, transit="Medium", groceries="Standard",
+    dining_out="Medium", insurance="Standard", gym=True, entertainment="Medium",
+    travel="Occasional",
+)
+
+def fixture_html() -> str:
+    """A BEA-like state RPP page with deterministic values."""
+    rows = "".join(
+        f"<tr><td>{name}</td><td>{85 + (k * 7) % 30:.1f}</td><td>{86 + (k * 5) % 28:.1f}</td></tr>"
+        for k, (_, _, name) in enumerate(STATES)
+    )
+    return (
+        "<html><body><table><thead><tr><th>State</th><th>2022</th><th>2021</th></tr></thead>"
+        f"<tbody>{rows}</tbody></table></body></html>"
+    )
+
+def households(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({f: rng.choice(levels, n) for f, levels in LEVELS.items()})
+    df["adults"] = rng.integers(1, 7, n)
+    df["kids"] = rng.integers(0, 7, n)
+    df["cars"] = rng.integers(0, 5, n)
+    df["premium_area"] = rng.random(n) < 0.3
+    df["gym"] = rng.random(n) < 0.4
+    df["rpp"] = rng.uniform(85.0, 115.0, n)
+    df["state"] = rng.choice([name for _, _, name in STATES], n)
+    return df
+
+def scenarios(workdir: Path) -> Dict[str, Callable[[], object]]:
+    html = fixture_html()
+    dataset = workdir / "rpp_states.json"
+    write_dataset(read_bea_html(html), "bench", "fixture", dataset)
+    table = load_rpp_table(dataset)
+    index = build_rpp_index(table)
+    batch = households(100_000)
+    # Many households sharing a few profiles, as in real payroll files
+    repeated = households(1_000, seed=1).sample(100_000, replace=True, random_state=0).reset_index(drop=True)
+    # Monthly totals across every state and filing status
+    rng = np.random.default_rng(2)
+    totals = rng.uniform(2_000.0, 25_000.0, 1_000_000)
+    tax_states = rng.choice([name for _, _, name in STATES], len(totals))
+    statuses = rng.choice(["single", "married_joint", "head_of_household"], len(totals))
+    batch_csv = workdir / "households.csv"
+    batch.to_csv(batch_csv, index=False)
+
+    def cold_basket():
+        invalidate_basket_cache()
+        return load_base_basket()
+
+    def cold_import():
+        subprocess.run(
+            [sys.executable, "-c", "import src.cost_model, src.rpp, src.batch"],
+            cwd=ROOT, check=True,
+        )
+
+    return {
+        # Scalar hot paths
+        "scalar.multipliers": lambda: multipliers(SAMPLE),
+        "scalar.estimate_monthly_cost": lambda: estimate_monthly_cost(SAMPLE, 108.9),
+        "scalar.linear_breakdown": lambda: linear_model().breakdown(SAMPLE, 108.9),
+        "scalar.recommend_income": lambda: recommend_income(6500.0, 0.15, 0.22, 0.05),
+        "scalar.recommend_income_brackets": lambda: recommend_income(6500.0, 0.15, buffer=0.05, state="New Jersey"),
+        "scalar.get_state_rpp.table": lambda: get_state_rpp(table, "New Jersey"),
+        "scalar.get_state_rpp.index": lambda: get_state_rpp(index, "New Jersey"),
+        "scalar.extract_states": lambda: extract_states(table),
+        "scalar.state_totals": lambda: state_totals(SAMPLE, index),
+        "scalar.rank_states": lambda: rank_states(SAMPLE, index),
+        # Batch
+        "batch.estimate_batch_100k": lambda: estimate_batch(batch),
+        "batch.estimate_batch_100k_repeated": lambda: estimate_batch(repeated),
+        "batch.score_csv_100k": lambda: score_file(batch_csv, workdir / "scored.csv"),
+        "batch.recommend_income_1m_brackets": lambda: recommend_income_batch(
+            totals, 0.15, buffer=0.05, state=tax_states, filing_status=statuses,
+        ),
+        "batch.affordable_lifestyles": lambda: affordable_lifestyles(index, 95_000, 0.15, 0.22, adults=2, kids=1),
+        "batch.sensitivity": lambda: sensitivity(SAMPLE, 108.9),
+        "batch.simulate_1m": lambda: simulate(SAMPLE, 108.9, n=1_000_000, seed=0),
+        # Cold start
+        "cold.load_base_basket": cold_basket,
+        "cold.parse_rpp_html": lambda: parse_rpp_html(html),
+        "cold.load_rpp_table": lambda: load_rpp_table(dataset),
+        "cold.build_rpp_index": lambda: build_rpp_index(table),
+        "cold.compile_linear_model": compile_linear_model,
+        "cold.import_modules": cold_import,
+    }
+
+def measure(fn: Callable[[], object], repeat: int, min_time: float) -> Dict[str, float]:
+    """Best-of-`repeat` seconds per call, with the call count auto-scaled to min_time."""
+    timer = timeit.Timer(fn)
+    number = 1
+    while True:
+        if timer.timeit(number) >= min_time or number >= 1_000_000:
+            break
+        number *= 10
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+    return {"seconds_per_call": best, "calls": number}
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> list[str]:
+    regressions = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        ratio = res["seconds_per_call"] / base["seconds_per_call"]
+        res["vs_baseline"] = ratio
+        if ratio > 1.0 + threshold:
+            regressions.append(f"{name}: {ratio:.2f}x baseline")
+    return regressions
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filter", default="", help="only run scenarios whose name contains this")
+    parser.add_argument("--out", default="bench_results.json", help="where to write results")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH), help="baseline results to compare with")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timing run")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run to --baseline")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for name, fn in scenarios(Path(tmp)).items():
+            if args.filter not in name:
+                continue
+            results[name] = measure(fn, args.repeat, args.min_time)
+            print(f"{name:<32} {results[name]['seconds_per_call'] * 1e6:>14,.2f} us/call")
+
+    baseline_path = Path(args.baseline)
+    regressions = []
+    if baseline_path.exists() and not args.save_baseline:
+        regressions = compare(results, json.loads(baseline_path.read_text())["results"], args.threshold)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "threshold": args.threshold,
+        },
+        "results": results,
+        "regressions": regressions,
+    }
+    Path(args.out).write_text(json.dumps(report, indent=2) + "\n")
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Saved baseline to {baseline_path}")
+
+    for r in regressions:
+        print(f"REGRESSION {r}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Inverse solver: which lifestyles does a given income afford, state by state?
+
+    frontier = affordable_lifestyles(index, gross_annual=85_000, savings_rate=0.15,
+                                     filing_status="married_joint", adults=2, kids=1)
+
+Cost never decreases when a comfort choice moves up a level (bigger home,
+premium groceries, one more car, ...), since every multiplier table is
+increasing. So the affordable set is closed downward, and a configuration is
+on the Pareto frontier exactly when none of its one-step upgrades is
+affordable. That turns the frontier into a handful of shifted comparisons on
+a dense (configurations x states) cost array instead of pairwise dominance
+checks. housing_mode and transit are not ranked; unless pinned via `fixed`,
+each configuration uses whichever of them is cheapest in that state.
+"""
+from __future__ import annotations
+from typing import Dict, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.cost_model import (
+    CODES, LEVELS, affordable_monthly_cost, category_costs, category_rpp,
+    coded_multipliers, load_base_basket,
+)
+from src.rpp import RppIndex
+from src.tax import has_tax_table
+
+# Ranked choices, each level at least as expensive as the one before it
+COMFORT_AXES = (
+    "bedrooms", "premium_area", "groceries", "dining_out", "insurance",
+    "entertainment", "gym", "travel", "cars",
+)
+# Unranked choices: the cheapest option is taken unless the caller pins one
+OPEN_AXES = ("housing_mode", "transit")
+
+def _axis_levels(field: str, max_cars: int) -> tuple:
+    if field in ("premium_area", "gym"):
+        return (False, True)
+    if field == "cars":
+        return tuple(range(max_cars + 1))
+    return LEVELS[field]
+
+def state_price_matrix(index: RppIndex, states: Sequence[str] | None = None) -> np.ndarray:
+    """(len(CATEGORIES), len(states)) per-category price multipliers; all states by default."""
+    if states is None:
+        return index.state_prices.T
+    return np.array([category_rpp(index.components(s)) for s in states]).T
+
+def affordable_lifestyles(index: RppIndex, gross_annual: float, savings_rate: float,
+                          effective_tax_rate: float | None = None, buffer: float = 0.0,
+                          adults: int = 1, kids: int = 0,
+                          states: Sequence[str] | None = None, fixed: Dict | None = None,
+                          max_cars: int = 4, frontier_only: bool = True,
+                          filing_status: str = "single") -> pd.DataFrame:
+    """
+    Every Inputs configuration per state whose monthly cost fits the budget
+    that the income leaves after that state's taxes, savings and buffer (see
+    affordable_monthly_cost); with frontier_only, just the Pareto-maximal ones.
+    fixed pins fields to one value, e.g. {"housing_mode": "Rent", "cars": 1}.
+    Returns one row per (state, configuration) with the Inputs fields,
+    "monthly_total" and "slack" (budget left over), cheapest-first per state;
+    attrs["budget"] maps each state to its budget. Unless a flat
+    effective_tax_rate is given, states without a tax table are skipped.
+    """
+    states = list(states) if states is not None else index.states
+    if effective_tax_rate is None:
+        # Places without a state tax table (e.g. a "United States" row) have no budget to compare
+        states = [s for s in states if has_tax_table(s)]
+        if not states:
+            raise ValueError("None of the states has a tax table; pass effective_tax_rate for a flat rate.")
+    prices = state_price_matrix(index, None if states == index.states else states)
+    budget = np.broadcast_to(affordable_monthly_cost(
+        gross_annual, savings_rate, effective_tax_rate, buffer, np.asarray(states, dtype=object), filing_status,
+    ), (len(states),))
+    fixed = dict(fixed or {})
+    unknown = set(fixed) - set(COMFORT_AXES + OPEN_AXES)
+    if unknown:
+        raise ValueError(f"Cannot fix {sorted(unknown)}; choose from {list(OPEN_AXES + COMFORT_AXES)}")
+
+    axes = OPEN_AXES + COMFORT_AXES
+    levels = {f: _axis_levels(f, max_cars) for f in axes}
+    for f, v in fixed.items():
+        if v not in levels[f]:
+            raise ValueError(f"{f} must be one of {list(levels[f])}, got {v!r}")
+        levels[f] = (v,)
+    shape = tuple(len(levels[f]) for f in axes)
+
+    # Price every configuration once at RPP 100, then all states in one matrix product
+    pos = dict(zip(axes, np.unravel_index(np.arange(int(np.prod(shape))), shape)))
+    value = {f: np.asarray(levels[f])[pos[f]] for f in ("premium_area", "gym", "cars")}
+    codes = {f: np.array([CODES[f][v] for v in levels[f]])[pos[f]] for f in LEVELS}
+    m = coded_multipliers(premium_area=value["premium_area"].astype(np.int8), **codes)
+    costs = category_costs(
+        load_base_basket(), m, extra_adults=max(adults - 1, 0), kids=kids,
+        cars=value["cars"].astype(float), gym=value["gym"].astype(bool),
+    )
+    n = len(value["cars"])
+    totals = np.column_stack([np.broadcast_to(c, (n,)) for c in costs]) @ prices
+
+    # Cheapest housing_mode/transit per (comfort configuration, state)
+    n_open = shape[0] * shape[1]
+    totals = totals.reshape(n_open, -1, len(states))
+    open_choice = totals.argmin(axis=0)
+    totals = totals.min(axis=0).reshape(*shape[2:], len(states))
+    fits = totals <= budget
+
+    keep = fits.copy()
+    if frontier_only:
+        for k in range(len(COMFORT_AXES)):
+            upgraded = np.zeros_like(fits)
+            src = [slice(None)] * fits.ndim
+            dst = [slice(None)] * fits.ndim
+            src[k], dst[k] = slice(1, None), slice(None, -1)
+            upgraded[tuple(dst)] = fits[tuple(src)]
+            keep &= ~upgraded
+
+    *comfort_pos, state_pos = np.nonzero(keep)
+    flat = np.ravel_multi_index(comfort_pos, shape[2:])
+    open_pos = np.unravel_index(open_choice[flat, state_pos], shape[:2])
+    out = {"state": np.asarray(states, dtype=object)[state_pos], "adults": adults, "kids": kids}
+    for f, p in zip(OPEN_AXES, open_pos):
+        out[f] = np.asarray(levels[f], dtype=object)[p]
+    for f, p in zip(COMFORT_AXES, comfort_pos):
+        out[f] = np.asarray(levels[f], dtype=object)[p]
+    out["monthly_total"] = totals[tuple(comfort_pos) + (state_pos,)]
+    df = pd.DataFrame(out)
+    df["slack"] = budget[state_pos] - df["monthly_total"]
+    df.attrs["budget"] = dict(zip(states, budget.tolist()))
+    order = np.lexsort((df["monthly_total"].to_numpy(), state_pos))
+    return df.iloc[order].reset_index(drop=True)
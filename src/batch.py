@@ -0,0 +1,142 @@
+from __future__ import annotations
+from typing import Mapping, Tuple
+import numpy as np
+import pandas as pd
+
+from src.cost_model import CATEGORIES, CATEGORY_COMPONENT, LEVELS, RppComponents, encode, encode_flag
+from src.grid import AXES, AXIS_SIZES
+from src.linear import LinearModel, linear_model
+from src.tax import gross_up
+
+# Income assumptions used when a caller gives none (server payloads, the scoring CLI); taxes
+# come from the bracket tables unless a flat effective_tax_rate is added
+DEFAULT_INCOME = {"savings_rate": 0.15, "buffer": 0.05, "filing_status": "single"}
+
+def _column(households, name: str) -> np.ndarray:
+    try:
+        return np.asarray(households[name])
+    except KeyError:
+        raise ValueError(f"Missing column '{name}'.") from None
+
+def _rpp_components(households, rpp_col: str) -> dict:
+    """RppComponents field -> float array; missing component columns reuse the all-items array."""
+    all_items = _column(households, rpp_col).astype(float)
+    components = {"all_items": all_items}
+    for name in RppComponents._fields[1:]:
+        col = f"{rpp_col}_{name}"
+        components[name] = _column(households, col).astype(float) if col in households else all_items
+    return components
+
+def row_codes(*columns: np.ndarray) -> np.ndarray:
+    """
+    One code per distinct row across equal-length columns (numbered in order of
+    appearance). Columns are folded in one at a time, refactorizing the pair,
+    so the key never outgrows int64 however many distinct values each holds.
+    """
+    codes = pd.factorize(columns[0], use_na_sentinel=False)[0]
+    for c in columns[1:]:
+        c_codes, uniques = pd.factorize(c, use_na_sentinel=False)
+        codes = pd.factorize(codes.astype(np.int64) * len(uniques) + c_codes)[0]
+    return codes
+
+def unique_rows(*columns: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    For equal-length columns, the index of the first occurrence of each
+    distinct row (in order of appearance) and, per row, the position of its
+    distinct row in that list. Rows are packed into one int64 key when the
+    columns' codes fit in 63 bits, which they do for household files.
+    """
+    codes = [
+        c if c.dtype.kind in "iu" and (not len(c) or c.min() >= 0) else pd.factorize(c, use_na_sentinel=False)[0]
+        for c in columns
+    ]
+    widths = [int(c.max()).bit_length() if len(c) else 0 for c in codes]
+    if sum(widths) <= 63:
+        key = np.zeros(len(codes[0]), dtype=np.int64)
+        for c, w in zip(codes, widths):
+            key <<= w
+            key |= c
+        inverse, uniques = pd.factorize(key)
+        # First occurrence = smallest row index per code; codes are numbered in
+        # order of appearance. O(n), unlike np.unique(..., return_index=True)'s sort
+        first = np.full(len(uniques), len(key), dtype=np.intp)
+        np.minimum.at(first, inverse, np.arange(len(key)))
+        return first, inverse
+    _, first, inverse = np.unique(np.column_stack(codes), axis=0, return_index=True, return_inverse=True)
+    return first, inverse.ravel()
+
+def estimate_batch(households: pd.DataFrame | Mapping[str, np.ndarray], rpp_col: str = "rpp",
+                   model: LinearModel | None = None) -> pd.DataFrame:
+    """
+    Vectorized estimate_monthly_cost over many households.
+
+    households: a DataFrame (or mapping of equal-length arrays) with one column per
+    Inputs field (``state`` is optional) plus an RPP index column named rpp_col.
+    Optional component columns (rpp_col + "_goods", "_housing", "_utilities",
+    "_other") price their categories per CATEGORY_COMPONENT instead.
+    Categorical columns may hold level labels or their integer codes; premium_area
+    and gym must hold booleans or 0/1 (anything else raises ValueError).
+    model defaults to the compiled form of the current basket (linear_model()).
+    Returns one row per household with a column per category and "Total".
+    Identical (household, RPP) rows are priced once; attrs["unique_rows"] and
+    attrs["dedup_ratio"] (rows per distinct row) report how much that saved.
+    """
+    codes = {field: encode(field, _column(households, field)) for field in LEVELS}
+    codes["premium_area"] = encode_flag("premium_area", _column(households, "premium_area"))
+    codes["gym"] = encode_flag("gym", _column(households, "gym"))
+    combo = np.ravel_multi_index(tuple(codes[f] for f, _ in AXES), AXIS_SIZES)
+    sizes = [_column(households, f) for f in ("adults", "kids", "cars")]
+    components = _rpp_components(households, rpp_col)
+
+    # One code per distinct RPP tuple, so the household key still packs into 63 bits
+    # when every component varies by row (metro-level RPPs)
+    rpp_code = row_codes(*{id(a): a for a in components.values()}.values())
+    first, inverse = unique_rows(combo, *sizes, rpp_code)
+    adults, kids, cars = (x[first].astype(float) for x in sizes)
+    costs = (model or linear_model()).evaluate(
+        combo[first],
+        extra_adults=np.maximum(adults - 1.0, 0.0),
+        kids=kids,
+        cars=cars,
+    )
+    costs *= np.column_stack([components[c][first] for c in CATEGORY_COMPONENT]) / 100.0
+
+    priced = np.empty((len(first), len(CATEGORIES) + 1))
+    priced[:, :-1] = costs
+    priced[:, -1] = costs.sum(axis=1)
+    out = priced.take(inverse, axis=0)
+
+    index = households.index if isinstance(households, pd.DataFrame) else None
+    df = pd.DataFrame(out, columns=[*CATEGORIES, "Total"], index=index)
+    df.attrs["unique_rows"] = len(first)
+    df.attrs["dedup_ratio"] = len(out) / max(len(first), 1)
+    return df
+
+def recommend_income_batch(monthly_cost, savings_rate, effective_tax_rate=None, buffer=0.0,
+                           state=None, filing_status="single") -> pd.DataFrame:
+    """
+    Vectorized recommend_income; every argument may be a scalar or an array.
+    The progressive gross-up runs one bracket search per distinct
+    (state, filing_status), not one solve per row.
+    """
+    monthly_cost = np.asarray(monthly_cost, dtype=float)
+    expenses_adjusted = monthly_cost * (1.0 + np.maximum(buffer, 0.0))
+
+    # Guardrails (same as recommend_income)
+    savings_rate = np.clip(savings_rate, 0.0, 0.80)
+
+    net_needed = expenses_adjusted / (1.0 - savings_rate)
+    if effective_tax_rate is None:
+        gross_needed = np.asarray(gross_up(net_needed * 12, state, filing_status)) / 12
+    else:
+        gross_needed = net_needed / (1.0 - np.clip(effective_tax_rate, 0.0, 0.60))
+    shape = np.shape(gross_needed)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = np.where(gross_needed > 0, 1.0 - net_needed / gross_needed, 0.0)
+    return pd.DataFrame({
+        "expenses_adjusted": np.broadcast_to(expenses_adjusted, shape),
+        "net_monthly": np.broadcast_to(net_needed, shape),
+        "gross_monthly": gross_needed,
+        "gross_annual": gross_needed * 12,
+        "effective_tax_rate": np.broadcast_to(rate, shape),
+    })
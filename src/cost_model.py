@@ -1,11 +1,27 @@
 from __future__ import annotations
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Dict
+from threading import Lock
+from typing import Dict, NamedTuple, Tuple
 import json
 from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from src.tax import gross_up, tax_on
+
+BASKET_PATH = Path(__file__).resolve().parent.parent / "data" / "base_basket_us.json"
+
+# Process-level cache: path -> (mtime, parsed basket)
+_BASKET_CACHE: Dict[str, Tuple[float, Dict]] = {}
 
 @dataclass
 class Inputs:
+    __slots__ = (
+        "state", "adults", "kids", "housing_mode", "bedrooms", "premium_area", "cars",
+        "transit", "groceries", "dining_out", "insurance", "gym", "entertainment", "travel",
+    )
+
     state: str
     adults: int
     kids: int
@@ -21,121 +37,502 @@ class Inputs:
     entertainment: str         # "Low" "Medium" "High"
     travel: str                # "None" "Occasional" "Frequent"
 
-def load_base_basket() -> Dict:
-    p = Path("data/base_basket_us.json")
-    return json.loads(p.read_text())
+    def freeze(self) -> FrozenInputs:
+        return FrozenInputs(*(getattr(self, f) for f in INPUT_FIELDS))
 
-def multipliers(i: Inputs) -> Dict[str, float]:
-    # Housing
-    bedroom_mult = {"Studio": 0.80, "1BR": 1.00, "2BR": 1.35, "3BR+": 1.70}[i.bedrooms]
-    premium_mult = 1.15 if i.premium_area else 1.00
-    own_mult = 1.00 if i.housing_mode == "Rent" else 0.95  # simplistic: owning may reduce monthly outlay vs rent in some cases
+INPUT_FIELDS = tuple(Inputs.__dataclass_fields__)
 
-    # Groceries & dining
-    groceries_mult = {"Budget": 0.85, "Standard": 1.00, "Premium": 1.25}[i.groceries]
-    dining_mult = {"Low": 0.70, "Medium": 1.00, "High": 1.50}[i.dining_out]
+@dataclass(frozen=True)
+class FrozenInputs:
+    """Immutable, slotted Inputs. Hashable, so it can key the estimate cache."""
+    __slots__ = INPUT_FIELDS
 
-    # Transit (affects transport category baseline)
-    transit_mult = {"Low": 1.10, "Medium": 1.00, "High": 0.85}[i.transit]
+    state: str
+    adults: int
+    kids: int
+    housing_mode: str
+    bedrooms: str
+    premium_area: bool
+    cars: int
+    transit: str
+    groceries: str
+    dining_out: str
+    insurance: str
+    gym: bool
+    entertainment: str
+    travel: str
 
-    # Insurance
-    insurance_mult = {"Basic": 0.85, "Standard": 1.00, "Premium": 1.25}[i.insurance]
+    # Frozen + manual __slots__: pickle cannot set the fields through __setattr__
+    def __getstate__(self):
+        return tuple(getattr(self, f) for f in INPUT_FIELDS)
 
-    # Entertainment & travel
-    entertainment_mult = {"Low": 0.80, "Medium": 1.00, "High": 1.35}[i.entertainment]
-    travel_add = {"None": 0, "Occasional": 120, "Frequent": 320}[i.travel]  # monthly add-on
+    def __setstate__(self, state):
+        for f, v in zip(INPUT_FIELDS, state):
+            object.__setattr__(self, f, v)
 
-    return {
-        "housing_mult": bedroom_mult * premium_mult * own_mult,
-        "groceries_mult": groceries_mult,
-        "dining_mult": dining_mult,
-        "transit_mult": transit_mult,
-        "insurance_mult": insurance_mult,
-        "entertainment_mult": entertainment_mult,
-        "travel_add": float(travel_add),
-    }
+# Max distinct (household, rpp) pairs kept by cached_estimate
+ESTIMATE_CACHE_SIZE = 4096
 
-def estimate_monthly_cost(i: Inputs, rpp_index: float) -> Dict[str, float]:
-    base = load_base_basket()
-    b = base["monthly_usd_single_adult"]
-    c = base["child_monthly"]
+def _flag(field: str, value) -> bool:
+    """A yes/no field: true/false or 1/0 only, so that e.g. the string "false" is not taken as True."""
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)) and value in (0, 1):
+        return bool(value)
+    raise ValueError(f"{field} must be true or false, got {value!r}")
+
+def inputs_from_dict(d: Dict) -> Inputs:
+    """
+    Builds Inputs from a plain mapping (e.g. parsed JSON), coercing numeric
+    fields, accepting only booleans (or 0/1) for the yes/no fields and
+    rejecting unknown levels with ValueError.
+    """
+    missing = [f for f in INPUT_FIELDS if f not in d]
+    if missing:
+        raise ValueError(f"Missing field(s): {', '.join(missing)}")
+    for field, levels in LEVELS.items():
+        if d[field] not in levels:
+            raise ValueError(f"{field} must be one of {list(levels)}, got {d[field]!r}")
+    try:
+        i = Inputs(
+            state=str(d["state"]),
+            adults=int(d["adults"]),
+            kids=int(d["kids"]),
+            housing_mode=d["housing_mode"],
+            bedrooms=d["bedrooms"],
+            premium_area=_flag("premium_area", d["premium_area"]),
+            cars=int(d["cars"]),
+            transit=d["transit"],
+            groceries=d["groceries"],
+            dining_out=d["dining_out"],
+            insurance=d["insurance"],
+            gym=_flag("gym", d["gym"]),
+            entertainment=d["entertainment"],
+            travel=d["travel"],
+        )
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid household: {e}") from None
+    if i.adults < 1 or i.kids < 0 or i.cars < 0:
+        raise ValueError("Need adults >= 1, kids >= 0 and cars >= 0.")
+    return i
+
+def load_base_basket(path: Path | str = BASKET_PATH, revalidate: bool = False) -> Dict:
+    """
+    Returns the parsed basket, reading the JSON only on the first call per path.
+    Cache hits never touch the filesystem; pass revalidate=True to stat the file
+    and reload it if its mtime changed since it was cached.
+    """
+    key = str(path)  # no resolve(): that would hit the filesystem on every call
+    hit = _BASKET_CACHE.get(key)
+    if hit is not None and not revalidate:
+        return hit[1]
+
+    mtime = Path(key).stat().st_mtime
+    if hit is not None and hit[0] == mtime:
+        return hit[1]
+
+    basket = json.loads(Path(key).read_text())
+    if hit is not None:
+        clear_estimate_cache()  # cached estimates were computed from the old basket
+    _BASKET_CACHE[key] = (mtime, basket)
+    return basket
+
+def invalidate_basket_cache(path: Path | str | None = None) -> None:
+    """Drops one cached basket (or all of them when path is None), and every cached estimate."""
+    if path is None:
+        _BASKET_CACHE.clear()
+    else:
+        _BASKET_CACHE.pop(str(path), None)
+    clear_estimate_cache()
+
+# Categorical levels. A level's code is its position in the tuple, so the
+# multiplier tables below are plain arrays indexed by code.
+LEVELS: Dict[str, Tuple[str, ...]] = {
+    "housing_mode": ("Rent", "Own"),
+    "bedrooms": ("Studio", "1BR", "2BR", "3BR+"),
+    "transit": ("Low", "Medium", "High"),
+    "groceries": ("Budget", "Standard", "Premium"),
+    "dining_out": ("Low", "Medium", "High"),
+    "insurance": ("Basic", "Standard", "Premium"),
+    "entertainment": ("Low", "Medium", "High"),
+    "travel": ("None", "Occasional", "Frequent"),
+}
+CODES: Dict[str, Dict[str, int]] = {f: {v: k for k, v in enumerate(lv)} for f, lv in LEVELS.items()}
+
+# Lifestyle multiplier tables, indexed by level code
+BEDROOM_MULT = np.array([0.80, 1.00, 1.35, 1.70])
+PREMIUM_MULT = np.array([1.00, 1.15])      # premium_area False / True
+OWN_MULT = np.array([1.00, 0.95])          # Rent / Own; simplistic: owning may reduce monthly outlay vs rent in some cases
+GROCERIES_MULT = np.array([0.85, 1.00, 1.25])
+DINING_MULT = np.array([0.70, 1.00, 1.50])
+TRANSIT_MULT = np.array([1.10, 1.00, 0.85])
+INSURANCE_MULT = np.array([0.85, 1.00, 1.25])
+ENTERTAINMENT_MULT = np.array([0.80, 1.00, 1.35])
+TRAVEL_ADD = np.array([0.0, 120.0, 320.0])  # monthly add-on
+
+# Combined housing multiplier, indexed [bedrooms, premium_area, housing_mode]
+HOUSING_MULT = BEDROOM_MULT[:, None, None] * PREMIUM_MULT[None, :, None] * OWN_MULT[None, None, :]
+
+# The same tables as Python floats keyed by label, for pricing one household:
+# dict lookups avoid NumPy scalar indexing, which costs far more per element
+_HOUSING_BY_LABEL = {
+    (bedrooms, premium, mode): HOUSING_MULT[b, int(premium), h].item()
+    for b, bedrooms in enumerate(LEVELS["bedrooms"])
+    for premium in (False, True)
+    for h, mode in enumerate(LEVELS["housing_mode"])
+}
+_MULT_BY_LABEL = {
+    field: dict(zip(LEVELS[field], table.tolist()))
+    for field, table in (
+        ("groceries", GROCERIES_MULT), ("dining_out", DINING_MULT), ("transit", TRANSIT_MULT),
+        ("insurance", INSURANCE_MULT), ("entertainment", ENTERTAINMENT_MULT), ("travel", TRAVEL_ADD),
+    )
+}
+
+# Output categories, in display order (excluding "Total")
+CATEGORIES = (
+    "Housing", "Utilities", "Groceries", "Dining Out", "Transportation",
+    "Healthcare", "Childcare", "Misc", "Travel",
+)
+
+class ModelParams(NamedTuple):
+    """Household-scaling and add-on constants used by category_costs."""
+    adult_groceries: float = 0.70   # groceries per extra adult
+    adult_shared: float = 0.35      # utilities, dining out and transport per extra adult
+    kid_utilities: float = 0.20     # utilities per child
+    adult_misc: float = 0.60
+    adult_health: float = 0.55
+    car_monthly: float = 450.0      # proxy all-in (payment/insurance/fuel/maintenance)
+    gym_monthly: float = 45.0
+
+MODEL_PARAMS = ModelParams()
+
+class Multipliers(NamedTuple):
+    housing_mult: float
+    groceries_mult: float
+    dining_mult: float
+    transit_mult: float
+    insurance_mult: float
+    entertainment_mult: float
+    travel_add: float
+
+class CostBreakdown(NamedTuple):
+    """Monthly cost per category, in CATEGORIES order, followed by the total."""
+    housing: float
+    utilities: float
+    groceries: float
+    dining_out: float
+    transportation: float
+    healthcare: float
+    childcare: float
+    misc: float
+    travel: float
+    total: float
+
+    def as_dict(self) -> Dict[str, float]:
+        """The {"Housing": ..., ..., "Total": ...} form returned by estimate_monthly_cost."""
+        return dict(zip(_BREAKDOWN_KEYS, self))
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, float]) -> "CostBreakdown":
+        return cls(*(float(d[k]) for k in _BREAKDOWN_KEYS))
+
+_BREAKDOWN_KEYS = (*CATEGORIES, "Total")
+
+class RppComponents(NamedTuple):
+    """BEA price parities (index, US = 100): all items plus its published components."""
+    all_items: float
+    goods: float
+    housing: float       # services: housing rents
+    utilities: float     # services: utilities
+    other: float         # services: other
+
+    @classmethod
+    def uniform(cls, rpp_index: float) -> "RppComponents":
+        return cls(*(float(rpp_index),) * 5)
+
+# Which RPP component prices each category, in CATEGORIES order
+CATEGORY_COMPONENT = (
+    "housing",     # Housing
+    "utilities",   # Utilities
+    "goods",       # Groceries
+    "other",       # Dining Out
+    "goods",       # Transportation (vehicles, fuel)
+    "other",       # Healthcare
+    "other",       # Childcare
+    "other",       # Misc (gym, entertainment)
+    "all_items",   # Travel (spent away from home, so not priced locally)
+)
+_CATEGORY_COMPONENT_POS = tuple(RppComponents._fields.index(c) for c in CATEGORY_COMPONENT)
+
+def category_rpp(rpp_index: float | RppComponents) -> tuple:
+    """Per-category price multipliers (1.0 = US average) for an all-items index or RppComponents."""
+    if isinstance(rpp_index, tuple):
+        return tuple(rpp_index[k] / 100.0 for k in _CATEGORY_COMPONENT_POS)
+    return (rpp_index / 100.0,) * len(CATEGORIES)
+
+def encode(field: str, values) -> np.ndarray:
+    """
+    Maps an array of level labels to int8 codes. Integer input is taken to be
+    codes already and only range-checked.
+    """
+    levels = LEVELS[field]
+    arr = np.asarray(values)
+    if arr.dtype.kind in "iub":
+        codes = arr.astype(np.int8)
+        bad = (codes < 0) | (codes >= len(levels))
+    else:
+        codes = pd.Categorical(arr, categories=levels).codes.astype(np.int8)
+        bad = codes < 0
+    if bad.any():
+        raise ValueError(f"Unknown {field} value(s): {sorted(set(arr[bad].astype(str).tolist()))[:5]}")
+    return codes
+
+def encode_flag(field: str, values) -> np.ndarray:
+    """
+    Maps an array of yes/no values to int8 0/1. Only booleans and 0/1 are
+    accepted; blanks, NaN and text such as "no" raise ValueError.
+    """
+    arr = np.asarray(values)
+    if arr.dtype.kind == "b":
+        return arr.astype(np.int8)
+    # Check each distinct value once
+    codes, uniques = pd.factorize(arr.ravel(), use_na_sentinel=False)
+    ok = [isinstance(u, (bool, np.bool_, int, np.integer, float, np.floating)) and u in (0, 1) for u in uniques]
+    if not all(ok):
+        bad = [u for u, good in zip(uniques, ok) if not good]
+        raise ValueError(f"{field} must be true/false or 1/0, got {sorted({str(u) for u in bad})[:5]}")
+    return np.array([int(u) for u in uniques], dtype=np.int8)[codes].reshape(arr.shape)
+
+def lifestyle_multipliers(i: Inputs) -> Multipliers:
+    t = _MULT_BY_LABEL
+    return Multipliers(
+        housing_mult=_HOUSING_BY_LABEL[i.bedrooms, bool(i.premium_area), i.housing_mode],
+        groceries_mult=t["groceries"][i.groceries],
+        dining_mult=t["dining_out"][i.dining_out],
+        transit_mult=t["transit"][i.transit],  # affects transport category baseline
+        insurance_mult=t["insurance"][i.insurance],
+        entertainment_mult=t["entertainment"][i.entertainment],
+        travel_add=t["travel"][i.travel],
+    )
+
+def multipliers(i: Inputs) -> Dict[str, float]:
+    return lifestyle_multipliers(i)._asdict()
 
-    rpp = rpp_index / 100.0  # convert index to multiplier
+def coded_multipliers(housing_mode, bedrooms, premium_area, transit, groceries,
+                      dining_out, insurance, entertainment, travel) -> Multipliers:
+    """
+    lifestyle_multipliers() for level codes; each argument may be an int or an
+    int array. The batch paths use this; single households use the label tables.
+    """
+    return Multipliers(
+        housing_mult=HOUSING_MULT[bedrooms, premium_area, housing_mode],
+        groceries_mult=GROCERIES_MULT[groceries],
+        dining_mult=DINING_MULT[dining_out],
+        transit_mult=TRANSIT_MULT[transit],
+        insurance_mult=INSURANCE_MULT[insurance],
+        entertainment_mult=ENTERTAINMENT_MULT[entertainment],
+        travel_add=TRAVEL_ADD[travel],
+    )
 
-    m = multipliers(i)
+def category_costs(base: Dict, m: Multipliers, extra_adults, kids, cars, gym,
+                   p: ModelParams = MODEL_PARAMS) -> tuple:
+    """
+    RPP-free monthly cost of each category, in CATEGORIES order.
+    Pure arithmetic, so every argument may be a scalar or a NumPy array
+    (the batch engine passes whole columns through the same formulas, and
+    src.simulate passes arrays of sampled basket values, multipliers and params).
+    """
+    b = base["monthly_usd_single_adult"]
+    c = base["child_monthly"]
 
     # Household scaling
-    extra_adults = max(i.adults - 1, 0)
-    adult_groceries_scale = 1.0 + 0.70 * extra_adults
-    adult_misc_scale = 1.0 + 0.60 * extra_adults
-    adult_health_scale = 1.0 + 0.55 * extra_adults
+    adult_groceries_scale = 1.0 + p.adult_groceries * extra_adults
+    adult_misc_scale = 1.0 + p.adult_misc * extra_adults
+    adult_health_scale = 1.0 + p.adult_health * extra_adults
+    adult_shared_scale = 1.0 + p.adult_shared * extra_adults
 
     # Housing: bedrooms already captures much of household sizing
-    housing = b["housing_1br"] * m["housing_mult"] * rpp
+    housing = b["housing_1br"] * m.housing_mult
 
-    utilities = b["utilities"] * (1.0 + 0.35 * extra_adults + 0.20 * i.kids) * rpp
-    groceries = b["groceries"] * adult_groceries_scale * m["groceries_mult"] * rpp + (c["groceries_per_child"] * i.kids * rpp)
-    dining = b["dining_out_base"] * (1.0 + 0.35 * extra_adults) * m["dining_mult"] * rpp
+    utilities = b["utilities"] * (adult_shared_scale + p.kid_utilities * kids)
+    groceries = b["groceries"] * adult_groceries_scale * m.groceries_mult + c["groceries_per_child"] * kids
+    dining = b["dining_out_base"] * adult_shared_scale * m.dining_mult
 
     # Transport: baseline + cars (cars are expensive), reduced if high transit usage
-    transport = b["transport_base"] * m["transit_mult"] * (1.0 + 0.35 * extra_adults) * rpp
-    car_add = i.cars * 450 * rpp  # proxy all-in (payment/insurance/fuel/maintenance)
-    transport += car_add
-
-    healthcare = b["healthcare"] * adult_health_scale * m["insurance_mult"] * rpp + (c["healthcare_per_child"] * i.kids * rpp)
-
-    childcare = (c["childcare_per_child"] * i.kids * rpp) if i.kids > 0 else 0.0
-
-    misc = b["misc"] * adult_misc_scale * rpp
-    if i.gym:
-        misc += 45 * rpp
-    misc *= m["entertainment_mult"]
-
-    travel = m["travel_add"] * rpp
-
-    out = {
-        "Housing": housing,
-        "Utilities": utilities,
-        "Groceries": groceries,
-        "Dining Out": dining,
-        "Transportation": transport,
-        "Healthcare": healthcare,
-        "Childcare": childcare,
-        "Misc": misc,
-        "Travel": travel,
-    }
-    out["Total"] = sum(out.values())
-    return out
-def recommend_income(monthly_cost: float, savings_rate: float, effective_tax_rate: float, buffer: float = 0.0) -> dict:
+    transport = b["transport_base"] * m.transit_mult * adult_shared_scale
+    transport = transport + cars * p.car_monthly
+
+    healthcare = b["healthcare"] * adult_health_scale * m.insurance_mult + c["healthcare_per_child"] * kids
+
+    childcare = c["childcare_per_child"] * kids
+
+    misc = (b["misc"] * adult_misc_scale + p.gym_monthly * gym) * m.entertainment_mult
+
+    travel = m.travel_add
+
+    return housing, utilities, groceries, dining, transport, healthcare, childcare, misc, travel
+
+def estimate_breakdown(i: Inputs, rpp_index: float | RppComponents) -> CostBreakdown:
+    """
+    rpp_index is either one all-items index (e.g. 112.6) applied to every
+    category, or RppComponents applied per category (see CATEGORY_COMPONENT).
+    """
+    costs = category_costs(
+        load_base_basket(), lifestyle_multipliers(i),
+        extra_adults=max(i.adults - 1, 0), kids=i.kids, cars=i.cars, gym=i.gym,
+    )
+    # Nine scalar products: cheaper in plain Python than a NumPy round trip for one household
+    values = [float(v) * r for v, r in zip(costs, category_rpp(rpp_index))]
+    return CostBreakdown(*values, sum(values))
+
+def estimate_monthly_cost(i: Inputs, rpp_index: float | RppComponents) -> Dict[str, float]:
+    return estimate_breakdown(i, rpp_index).as_dict()
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+class _LruCache:
+    """
+    A bounded LRU mapping with lru_cache-style counters. Unlike lru_cache it
+    can be probed and filled directly, so batch callers can price only the
+    misses in one vectorized pass and store the results.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+_ESTIMATE_CACHE = _LruCache(ESTIMATE_CACHE_SIZE)
+
+class _Key(list):
+    """[frozen inputs, rpp] hashed once, as in functools.lru_cache: a lookup probes the dict twice."""
+    __slots__ = ("hashvalue",)
+
+    def __init__(self, i: FrozenInputs, rpp_index: float | RppComponents):
+        self[:] = (i, rpp_index)
+        self.hashvalue = hash((i, rpp_index))
+
+    def __hash__(self):
+        return self.hashvalue
+
+def _cache_key(i: Inputs | FrozenInputs, rpp_index: float | RppComponents) -> _Key:
+    if not isinstance(i, FrozenInputs):
+        i = i.freeze()
+    if not isinstance(rpp_index, RppComponents):
+        rpp_index = float(rpp_index)
+    return _Key(i, rpp_index)
+
+def cached_breakdown(i: Inputs | FrozenInputs, rpp_index: float | RppComponents) -> CostBreakdown:
+    """estimate_breakdown behind a bounded LRU cache keyed on (frozen inputs, rpp)."""
+    key = _cache_key(i, rpp_index)
+    hit = _ESTIMATE_CACHE.get(key)
+    if hit is None:
+        hit = estimate_breakdown(key[0], key[1])
+        _ESTIMATE_CACHE.put(key, hit)
+    return hit
+
+def lookup_breakdown(i: Inputs | FrozenInputs, rpp_index: float | RppComponents) -> CostBreakdown | None:
+    """The cached breakdown, or None (counted as a miss) without computing it."""
+    return _ESTIMATE_CACHE.get(_cache_key(i, rpp_index))
+
+def store_breakdown(i: Inputs | FrozenInputs, rpp_index: float | RppComponents, breakdown: CostBreakdown) -> None:
+    """Adds a breakdown priced elsewhere (e.g. in a batch) to the estimate cache."""
+    _ESTIMATE_CACHE.put(_cache_key(i, rpp_index), breakdown)
+
+def cached_estimate(i: Inputs | FrozenInputs, rpp_index: float | RppComponents) -> Dict[str, float]:
+    """Dict form of cached_breakdown; a fresh dict each call, so callers may mutate it."""
+    return cached_breakdown(i, rpp_index).as_dict()
+
+def estimate_cache_info() -> CacheInfo:
+    """(hits, misses, maxsize, currsize) of the estimate cache."""
+    return _ESTIMATE_CACHE.info()
+
+def clear_estimate_cache() -> None:
+    _ESTIMATE_CACHE.clear()
+
+def recommend_income(monthly_cost: float, savings_rate: float, effective_tax_rate: float | None = None,
+                     buffer: float = 0.0, state: str | None = None, filing_status: str = "single") -> dict:
     """
     Computes gross income needed to cover:
       - monthly_cost (expenses)
       - savings_rate (as % of net income)
-      - effective_tax_rate (as % of gross income)
+      - income and payroll taxes: progressive federal + state (src.tax) for
+        the state and filing_status, or a flat effective_tax_rate (as % of
+        gross income) when one is given
       - optional buffer on costs (e.g., 0.05 => +5%)
 
     Model:
-      gross_income * (1 - tax_rate) = net_income
+      net_income = gross_income - tax(gross_income)
       net_income = expenses_adjusted + savings_rate * net_income
       => net_income * (1 - savings_rate) = expenses_adjusted
       => net_income = expenses_adjusted / (1 - savings_rate)
-      => gross = net_income / (1 - tax_rate)
+      => gross = tax.gross_up(net_income)   (flat: net_income / (1 - tax_rate))
     """
     expenses_adjusted = monthly_cost * (1.0 + max(buffer, 0.0))
 
     # Guardrails
     savings_rate = min(max(savings_rate, 0.0), 0.80)
-    effective_tax_rate = min(max(effective_tax_rate, 0.0), 0.60)
 
     if savings_rate >= 1.0:
         raise ValueError("Savings rate must be < 100%.")
 
     net_needed = expenses_adjusted / (1.0 - savings_rate)
-    gross_needed = net_needed / (1.0 - effective_tax_rate) if effective_tax_rate < 1.0 else float("inf")
+    if effective_tax_rate is None:
+        gross_needed = gross_up(net_needed * 12, state, filing_status) / 12
+    else:
+        effective_tax_rate = min(max(effective_tax_rate, 0.0), 0.60)
+        gross_needed = net_needed / (1.0 - effective_tax_rate) if effective_tax_rate < 1.0 else float("inf")
 
     return {
         "expenses_adjusted": expenses_adjusted,
         "net_monthly": net_needed,
         "gross_monthly": gross_needed,
-        "gross_annual": gross_needed * 12
+        "gross_annual": gross_needed * 12,
+        "effective_tax_rate": 1.0 - net_needed / gross_needed if gross_needed > 0 else 0.0,
     }
+
+def affordable_monthly_cost(gross_annual, savings_rate: float, effective_tax_rate: float | None = None,
+                            buffer: float = 0.0, state=None, filing_status="single"):
+    """
+    Inverse of recommend_income: the largest monthly_cost a gross annual income
+    covers. state (and gross_annual, filing_status) may be arrays, giving one
+    budget per element.
+    """
+    savings_rate = min(max(savings_rate, 0.0), 0.80)
+    if effective_tax_rate is None:
+        net_monthly = (gross_annual - tax_on(gross_annual, state, filing_status)) / 12
+    else:
+        effective_tax_rate = min(max(effective_tax_rate, 0.0), 0.60)
+        net_monthly = gross_annual / 12 * (1.0 - effective_tax_rate)
+    return net_monthly * (1.0 - savings_rate) / (1.0 + max(buffer, 0.0))
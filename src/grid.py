@@ -0,0 +1,152 @@
+"""
+Precomputed scenario grid: every lifestyle combination x household size.
+
+    python -m src.grid build [--max-adults 6 --max-kids 6 --max-cars 4]
+    python -m src.grid check [--samples 100000]
+
+The grid stores every estimate_monthly_cost output at RPP 100 as a dense
+float32 array, memory-mapped at lookup time. Costs are linear in RPP, so the
+state axis is a single multiply at lookup instead of a 51x larger file.
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import sys
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+
+from src.cost_model import (
+    CATEGORIES, CODES, LEVELS, CostBreakdown, Inputs, Multipliers, RppComponents, category_costs,
+    category_rpp, coded_multipliers, estimate_monthly_cost, load_base_basket,
+)
+
+GRID_PATH = Path(__file__).resolve().parent.parent / "data" / "scenario_grid.npy"
+
+# Categorical axes, in storage order; booleans are 2-level axes
+AXES = (
+    ("housing_mode", 2), ("bedrooms", 4), ("premium_area", 2), ("transit", 3),
+    ("groceries", 3), ("dining_out", 3), ("insurance", 3), ("entertainment", 3),
+    ("gym", 2), ("travel", 3),
+)
+AXIS_SIZES = tuple(n for _, n in AXES)
+N_COMBOS = int(np.prod(AXIS_SIZES))
+
+def basket_fingerprint(basket: Dict) -> str:
+    return hashlib.sha256(json.dumps(basket, sort_keys=True).encode()).hexdigest()[:16]
+
+def _meta_path(path: Path) -> Path:
+    return path.with_suffix(".json")
+
+def axis_codes(i: Inputs) -> tuple:
+    """Level codes of i along AXES, in storage order."""
+    return tuple(
+        int(bool(getattr(i, f))) if f in ("premium_area", "gym") else CODES[f][getattr(i, f)]
+        for f, _ in AXES
+    )
+
+def build_grid(path: Path | str = GRID_PATH, max_adults: int = 6, max_kids: int = 6, max_cars: int = 4,
+               chunk: int = 512) -> Path:
+    """Evaluates the model over the whole grid and writes it to path (plus a .json sidecar)."""
+    path = Path(path)
+    basket = load_base_basket()
+    shape = (N_COMBOS, max_adults, max_kids + 1, max_cars + 1, len(CATEGORIES) + 1)
+    out = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=shape)
+
+    adults, kids, cars = np.meshgrid(
+        np.arange(1, max_adults + 1), np.arange(max_kids + 1), np.arange(max_cars + 1), indexing="ij"
+    )
+    hh = shape[1:4]
+    for start in range(0, N_COMBOS, chunk):
+        combos = np.arange(start, min(start + chunk, N_COMBOS))
+        codes = dict(zip((f for f, _ in AXES), np.unravel_index(combos, AXIS_SIZES)))
+        gym = codes.pop("gym")[:, None, None, None]
+        m = Multipliers(*(v[:, None, None, None] for v in coded_multipliers(**codes)))
+        costs = category_costs(
+            basket, m,
+            extra_adults=(adults - 1)[None].astype(float), kids=kids[None].astype(float),
+            cars=cars[None].astype(float), gym=gym,
+        )
+        block = np.empty((len(combos), *hh, len(CATEGORIES) + 1))
+        for j, v in enumerate(costs):
+            block[..., j] = v
+        block[..., -1] = block[..., :-1].sum(axis=-1)
+        out[combos] = block
+    out.flush()
+    del out
+
+    meta = {
+        "shape": list(shape),
+        "max_adults": max_adults, "max_kids": max_kids, "max_cars": max_cars,
+        "basket": basket_fingerprint(basket),
+    }
+    _meta_path(path).write_text(json.dumps(meta, indent=2) + "\n")
+    return path
+
+class ScenarioGrid:
+    """Read-only, memory-mapped view of a built grid."""
+
+    def __init__(self, path: Path | str = GRID_PATH):
+        path = Path(path)
+        self.meta = json.loads(_meta_path(path).read_text())
+        if self.meta["basket"] != basket_fingerprint(load_base_basket()):
+            raise ValueError(f"{path} was built from a different basket; rebuild it with `python -m src.grid build`.")
+        self.values = np.load(path, mmap_mode="r")
+        self.max_adults = self.meta["max_adults"]
+        self.max_kids = self.meta["max_kids"]
+        self.max_cars = self.meta["max_cars"]
+
+    def covers(self, i: Inputs) -> bool:
+        return 1 <= i.adults <= self.max_adults and 0 <= i.kids <= self.max_kids and 0 <= i.cars <= self.max_cars
+
+    def lookup(self, i: Inputs, rpp_index: float | RppComponents) -> Dict[str, float]:
+        """Same result as estimate_monthly_cost (to float32 precision); KeyError outside the grid."""
+        if not self.covers(i):
+            raise KeyError("Household size outside the precomputed grid.")
+        combo = np.ravel_multi_index(axis_codes(i), AXIS_SIZES)
+        values = self.values[combo, i.adults - 1, i.kids, i.cars, :-1] * np.array(category_rpp(rpp_index))
+        return CostBreakdown(*values.tolist(), float(values.sum())).as_dict()
+
+def check_grid(grid: ScenarioGrid, samples: int = 100_000, seed: int = 0) -> float:
+    """Max relative error of random grid cells against the live model."""
+    rng = np.random.default_rng(seed)
+    worst = 0.0
+    for _ in range(samples):
+        codes = [int(rng.integers(n)) for n in AXIS_SIZES]
+        fields = {f: (bool(c) if f in ("premium_area", "gym") else LEVELS[f][c]) for (f, _), c in zip(AXES, codes)}
+        i = Inputs(
+            state="", adults=int(rng.integers(1, grid.max_adults + 1)), kids=int(rng.integers(grid.max_kids + 1)),
+            cars=int(rng.integers(grid.max_cars + 1)), **fields,
+        )
+        rpp = RppComponents(*rng.uniform(80.0, 120.0, 5).tolist())
+        live, cached = estimate_monthly_cost(i, rpp), grid.lookup(i, rpp)
+        for k, v in live.items():
+            worst = max(worst, abs(cached[k] - v) / max(abs(v), 1.0))
+    return worst
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Build or verify the precomputed scenario grid.")
+    parser.add_argument("command", choices=["build", "check"])
+    parser.add_argument("--path", default=str(GRID_PATH))
+    parser.add_argument("--max-adults", type=int, default=6)
+    parser.add_argument("--max-kids", type=int, default=6)
+    parser.add_argument("--max-cars", type=int, default=4)
+    parser.add_argument("--samples", type=int, default=100_000, help="random cells to verify")
+    parser.add_argument("--tolerance", type=float, default=1e-6, help="max relative error for check")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        path = build_grid(args.path, args.max_adults, args.max_kids, args.max_cars)
+        size = path.stat().st_size / 2**20
+        print(f"Wrote {path} ({size:,.0f} MiB)")
+        return 0
+
+    worst = check_grid(ScenarioGrid(args.path), args.samples)
+    ok = worst <= args.tolerance
+    print(f"Checked {args.samples:,} cells: max relative error {worst:.2e} ({'OK' if ok else 'MISMATCH'})")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
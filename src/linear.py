@@ -0,0 +1,121 @@
+"""
+The cost model compiled to closed form.
+
+Given the categorical choices, every category cost is affine in
+(extra adults, kids, cars) and linear in its RPP, so the whole model is one
+(features x categories) coefficient matrix per lifestyle combination:
+
+    cost[c] = ([1, extra_adults, kids, cars] @ C[:, combo, c]) * rpp[c] / 100
+
+    python -m src.linear verify [--samples 100000]
+
+compile_linear_model() derives the matrices from category_costs itself (the
+value at zero plus one unit step per feature), so they follow any basket or
+ModelParams change; verify_linear_model() checks them against the reference
+estimate_breakdown, including households far outside the grid's size range.
+"""
+from __future__ import annotations
+import argparse
+import sys
+from operator import attrgetter
+from typing import Dict, Tuple
+
+import numpy as np
+
+from src.cost_model import (
+    CODES, LEVELS, MODEL_PARAMS, CostBreakdown, Inputs, ModelParams, RppComponents,
+    category_costs, category_rpp, coded_multipliers, estimate_breakdown, load_base_basket,
+)
+from src.grid import AXES, AXIS_SIZES, N_COMBOS
+
+FEATURES = ("intercept", "extra_adults", "kids", "cars")
+
+# Per axis, level -> code * stride, so a combo index is a sum of dict hits (no ravel_multi_index per call)
+_STRIDES = tuple(int(np.prod(AXIS_SIZES[k + 1:])) for k in range(len(AXES)))
+_COMBO_STEPS = tuple(
+    {False: 0, True: stride} if field in ("premium_area", "gym") else {v: c * stride for v, c in CODES[field].items()}
+    for (field, _), stride in zip(AXES, _STRIDES)
+)
+_axis_values = attrgetter(*(field for field, _ in AXES))
+
+class LinearModel:
+    """Coefficient matrices for every lifestyle combination (AXES order)."""
+
+    def __init__(self, coefficients: np.ndarray):
+        # (len(FEATURES), N_COMBOS, len(CATEGORIES)): one contiguous table per feature,
+        # so batch evaluation is a row gather per feature
+        self.coefficients = coefficients
+
+    def combo(self, i: Inputs) -> int:
+        return sum(map(dict.__getitem__, _COMBO_STEPS, _axis_values(i)))
+
+    def breakdown(self, i: Inputs, rpp_index: float | RppComponents) -> CostBreakdown:
+        x = np.array([1.0, max(i.adults - 1, 0), i.kids, i.cars])
+        values = (x @ self.coefficients[:, self.combo(i)]) * np.array(category_rpp(rpp_index))
+        return CostBreakdown(*values.tolist(), float(values.sum()))
+
+    def evaluate(self, combo: np.ndarray, extra_adults, kids, cars) -> np.ndarray:
+        """RPP-free (n, len(CATEGORIES)) costs for arrays of combo indexes and household sizes."""
+        c = self.coefficients
+        out = c[0].take(combo, axis=0)
+        for k, x in enumerate((extra_adults, kids, cars), start=1):
+            out += np.asarray(x, dtype=float)[:, None] * c[k].take(combo, axis=0)
+        return out
+
+def compile_linear_model(basket: Dict | None = None, params: ModelParams = MODEL_PARAMS) -> LinearModel:
+    basket = basket or load_base_basket()
+    codes = dict(zip((f for f, _ in AXES), np.unravel_index(np.arange(N_COMBOS), AXIS_SIZES)))
+    gym = codes.pop("gym").astype(bool)
+    m = coded_multipliers(**codes)
+
+    def at(extra_adults, kids, cars) -> np.ndarray:
+        costs = category_costs(basket, m, extra_adults, kids, cars, gym, params)
+        return np.column_stack([np.broadcast_to(v, (N_COMBOS,)) for v in costs])
+
+    zero = at(0.0, 0.0, 0.0)
+    coefficients = np.stack([zero, at(1.0, 0.0, 0.0) - zero, at(0.0, 1.0, 0.0) - zero, at(0.0, 0.0, 1.0) - zero])
+    coefficients.setflags(write=False)
+    return LinearModel(coefficients)
+
+# Compiled models by (basket identity, params); the basket is held so its id stays unique
+_COMPILED: Dict[Tuple[int, ModelParams], Tuple[Dict, LinearModel]] = {}
+
+def linear_model(params: ModelParams = MODEL_PARAMS) -> LinearModel:
+    """The compiled form of the currently loaded basket, compiled on first use."""
+    basket = load_base_basket()
+    hit = _COMPILED.get((id(basket), params))
+    if hit is None:
+        _COMPILED.clear()  # only the current basket is ever needed
+        hit = _COMPILED[(id(basket), params)] = (basket, compile_linear_model(basket, params))
+    return hit[1]
+
+def verify_linear_model(model: LinearModel, samples: int = 100_000, seed: int = 0) -> float:
+    """Max relative error of the compiled model against estimate_breakdown on random households."""
+    rng = np.random.default_rng(seed)
+    worst = 0.0
+    for _ in range(samples):
+        fields = {f: levels[int(rng.integers(len(levels)))] for f, levels in LEVELS.items()}
+        i = Inputs(
+            state="", adults=int(rng.integers(1, 13)), kids=int(rng.integers(0, 13)), cars=int(rng.integers(0, 9)),
+            premium_area=bool(rng.integers(2)), gym=bool(rng.integers(2)), **fields,
+        )
+        rpp = RppComponents(*rng.uniform(75.0, 130.0, 5).tolist())
+        ref, got = estimate_breakdown(i, rpp), model.breakdown(i, rpp)
+        for r, g in zip(ref, got):
+            worst = max(worst, abs(g - r) / max(abs(r), 1.0))
+    return worst
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Verify the compiled linear form of the cost model.")
+    parser.add_argument("command", choices=["verify"])
+    parser.add_argument("--samples", type=int, default=100_000, help="random households to check")
+    parser.add_argument("--tolerance", type=float, default=1e-9, help="max relative error")
+    args = parser.parse_args(argv)
+
+    worst = verify_linear_model(linear_model(), args.samples)
+    ok = worst <= args.tolerance
+    print(f"Checked {args.samples:,} households: max relative error {worst:.2e} ({'OK' if ok else 'MISMATCH'})")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
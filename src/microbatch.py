@@ -0,0 +1,69 @@
+"""
+Coalesces concurrent single requests into one vectorized call (asyncio).
+
+    batcher = MicroBatcher(service.estimate_many, max_batch=256, max_delay=0.002)
+    result = await batcher.submit(request)
+
+fn takes a list of items and returns a list of results in the same order. A
+batch is flushed once it holds max_batch items, or max_delay seconds after
+its first item arrived. With max_delay=0 a batch holds whatever arrived
+during the same event-loop iteration, so no request ever waits on a timer.
+"""
+from __future__ import annotations
+import asyncio
+from typing import Callable, Dict, List
+
+class MicroBatcher:
+    def __init__(self, fn: Callable[[List], List], max_batch: int = 256, max_delay: float = 0.0):
+        if max_batch < 1 or max_delay < 0:
+            raise ValueError("Need max_batch >= 1 and max_delay >= 0.")
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending: List[tuple] = []
+        self._timer: asyncio.Handle | None = None
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item):
+        """Queues item and waits for its result; fn's exception, if any, is raised here."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self.flush()
+        elif self._timer is None:
+            self._timer = (
+                loop.call_later(self.max_delay, self.flush) if self.max_delay > 0 else loop.call_soon(self.flush)
+            )
+        return await future
+
+    def flush(self) -> None:
+        """Runs fn on everything queued so far and resolves the waiting futures."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = self.fn([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():  # the caller may have gone away
+                future.set_result(result)
+
+    def stats(self) -> Dict:
+        return {
+            "batches": self.batches,
+            "requests": self.items,
+            "mean_batch": self.items / self.batches if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "max_delay_ms": self.max_delay * 1000,
+        }
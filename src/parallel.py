@@ -0,0 +1,178 @@
+"""
+Multi-core scoring: splits a household file across worker processes.
+
+    python -m src.score households.csv -o scored.csv --workers 8
+
+The compiled linear model (src.linear) is copied once into
+multiprocessing.shared_memory and every worker maps it read-only, instead of
+compiling or unpickling its own copy. Each worker parses its own share of the
+input (a byte range of a CSV file, a set of row groups of a Parquet file), so
+parsing runs in parallel too; it scores that share chunk by chunk exactly like
+src.score and writes a part file. The parts are joined in input order. Only
+the RPP index itself (a few dozen KB of lookup tables) is pickled, once per
+worker.
+
+A Parquet file is split by row groups, so a file written as a single row
+group is scored by one worker. CSV parts are cut at line breaks, so quoted
+fields must not contain newlines (household files have none).
+"""
+from __future__ import annotations
+import csv
+import io
+import os
+import shutil
+from multiprocessing import get_context, shared_memory
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.batch import DEFAULT_INCOME
+from src.linear import LinearModel, linear_model
+from src.rpp import RppIndex
+from src.score import CHUNK_SIZE, CSV_OPTIONS, _is_parquet, _writer, pa, pq, write_scored
+
+# Per-process state set up by _init_worker: shared-memory handle, model, index, options
+_WORKER: Dict = {}
+
+def share_array(a: np.ndarray) -> Tuple[shared_memory.SharedMemory, tuple]:
+    """Copies a into a new shared-memory block; returns the block and the spec attach_array needs."""
+    shm = shared_memory.SharedMemory(create=True, size=max(a.nbytes, 1))
+    np.ndarray(a.shape, a.dtype, buffer=shm.buf)[...] = a
+    return shm, (shm.name, a.shape, a.dtype.str)
+
+def attach_array(spec: tuple) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    """Maps a block created by share_array as a read-only array (keep the block referenced)."""
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    a = np.ndarray(shape, np.dtype(dtype), buffer=shm.buf)
+    a.setflags(write=False)
+    return shm, a
+
+def _init_worker(model_spec: tuple, index: RppIndex | None, income_options: Dict, chunk_size: int) -> None:
+    shm, coefficients = attach_array(model_spec)
+    _WORKER.update(shm=shm, model=LinearModel(coefficients), index=index,
+                   income_options=income_options, chunk_size=chunk_size)
+
+class _ByteRange(io.RawIOBase):
+    """Reads bytes [start, end) of a file."""
+
+    def __init__(self, path: Path, start: int, end: int):
+        self.f = open(path, "rb")
+        self.f.seek(start)
+        self.left = end - start
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = self.f.readinto(memoryview(b)[:min(len(b), self.left)])
+        self.left -= n
+        return n
+
+    def close(self) -> None:
+        self.f.close()
+        super().close()
+
+def _csv_parts(path: Path, n: int) -> Tuple[List[str], List[Tuple[int, int]]]:
+    """Column names and up to n byte ranges of whole lines after the header."""
+    size = path.stat().st_size
+    with open(path, "rb") as f:
+        header = f.readline()
+        cuts = [f.tell()]
+        for k in range(1, n):
+            f.seek(max(cuts[0] + (size - cuts[0]) * k // n - 1, cuts[-1]))
+            f.readline()  # move to the start of the next line
+            cuts.append(f.tell())
+    cuts.append(size)
+    names = next(csv.reader([header.decode("utf-8-sig")]))
+    return names, [(a, b) for a, b in zip(cuts, cuts[1:]) if b > a]
+
+def _parquet_parts(path: Path, n: int) -> List[List[int]]:
+    """Row groups split into up to n contiguous runs of similar row counts."""
+    meta = pq.ParquetFile(path).metadata
+    rows = np.cumsum([meta.row_group(g).num_rows for g in range(meta.num_row_groups)])
+    owner = np.minimum(((rows - 1) * n) // max(int(rows[-1]) if len(rows) else 1, 1), n - 1)
+    return [np.flatnonzero(owner == k).tolist() for k in range(n) if (owner == k).any()]
+
+def _score_part(task: tuple) -> int:
+    src, k, part, out, parquet_out = task
+    w = _WORKER
+    handle = None
+    if _is_parquet(src):
+        chunks = (b.to_pandas() for b in pq.ParquetFile(src).iter_batches(batch_size=w["chunk_size"], row_groups=part))
+    else:
+        names, (start, end) = part
+        handle = io.BufferedReader(_ByteRange(src, start, end))
+        chunks = pd.read_csv(handle, header=None, names=names, chunksize=w["chunk_size"], **CSV_OPTIONS)
+    writer = _writer(out, parquet_out)
+    try:
+        return write_scored(chunks, writer, w["index"], w["income_options"], w["model"])
+    except ValueError as e:
+        raise ValueError(f"Part {k + 1}: {e}") from None
+    finally:
+        writer.close()
+        if handle is not None:
+            handle.close()
+
+def _join_parts(parts: List[Path], dst: Path, parquet: bool) -> None:
+    """Concatenates part files in order; every part carries its own CSV header or Parquet schema."""
+    parts = [p for p in parts if p.exists()]
+    if parquet:
+        writer = schema = None
+        try:
+            for p in parts:
+                f = pq.ParquetFile(p)
+                for g in range(f.num_row_groups):
+                    table = f.read_row_group(g)
+                    if writer is None:
+                        schema = table.schema
+                        writer = pq.ParquetWriter(str(dst), schema)
+                    writer.write_table(table.cast(schema))
+        finally:
+            if writer is not None:
+                writer.close()
+        return
+    with open(dst, "wb") as out:
+        for k, p in enumerate(parts):
+            with open(p, "rb") as f:
+                if k:
+                    f.readline()
+                shutil.copyfileobj(f, out, 1 << 20)
+
+def score_file_parallel(src: Path | str, dst: Path | str, index: RppIndex | None = None, workers: int | None = None,
+                        chunk_size: int = CHUNK_SIZE, income_options: Dict | None = None) -> int:
+    """score_file across worker processes (one per core by default); same output, rows in input order."""
+    src, dst = Path(src), Path(dst)
+    workers = workers or os.cpu_count() or 1
+    income_options = {**DEFAULT_INCOME, **(income_options or {})}
+    if _is_parquet(src) or _is_parquet(dst):
+        if pa is None:
+            raise ValueError("Reading or writing Parquet needs pyarrow (pip install pyarrow).")
+    if _is_parquet(src):
+        parts = _parquet_parts(src, workers)
+    else:
+        names, ranges = _csv_parts(src, workers)
+        parts = [(names, r) for r in ranges]
+
+    tmp = dst.with_name(f".{dst.name}.{os.getpid()}.tmp")
+    outs = [dst.with_name(f".{dst.name}.{os.getpid()}.part{k}") for k in range(len(parts))]
+    shm, spec = share_array(linear_model().coefficients)
+    try:
+        with get_context().Pool(
+            min(workers, max(len(parts), 1)), initializer=_init_worker,
+            initargs=(spec, index, income_options, chunk_size),
+        ) as pool:
+            tasks = [(src, k, p, out, _is_parquet(dst)) for k, (p, out) in enumerate(zip(parts, outs))]
+            counts = pool.map(_score_part, tasks, chunksize=1)
+        _join_parts(outs, tmp, _is_parquet(dst))
+        if not tmp.exists() or not any(counts):
+            raise ValueError(f"{src} has no rows.")
+        os.replace(tmp, dst)
+    finally:
+        shm.close()
+        shm.unlink()
+        for p in (tmp, *outs):
+            p.unlink(missing_ok=True)
+    return sum(counts)
@@ -0,0 +1,57 @@
+"""
+Ranks every state by what a fixed household would pay there.
+
+For fixed Inputs the cost is linear in the price level of each category, so
+the RPP-free category costs are computed once and broadcast against the
+index's (states x categories) price matrix; no per-state estimate calls.
+
+    rank_states(inputs, index).head(10)
+"""
+from __future__ import annotations
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from src.batch import recommend_income_batch
+from src.cost_model import CATEGORIES, Inputs, category_costs, lifestyle_multipliers, load_base_basket
+from src.rpp import RppIndex
+from src.tax import has_tax_table, tax_states
+
+def rpp_free_costs(i: Inputs) -> np.ndarray:
+    """The household's monthly cost per category at RPP 100, in CATEGORIES order."""
+    costs = category_costs(
+        load_base_basket(), lifestyle_multipliers(i),
+        extra_adults=max(i.adults - 1, 0), kids=i.kids, cars=i.cars, gym=i.gym,
+    )
+    return np.array(costs, dtype=float)
+
+def state_totals(i: Inputs, index: RppIndex) -> np.ndarray:
+    """Monthly total in every state, in index.states order."""
+    return index.state_prices @ rpp_free_costs(i)
+
+def rank_states(i: Inputs, index: RppIndex, income_options: Dict | None = None) -> pd.DataFrame:
+    """
+    Cheapest-first table of every state: rank, state, rpp (all items), one
+    column per category, "Total" and, given income_options (savings_rate,
+    buffer, filing_status or a flat effective_tax_rate), "Gross annual
+    needed", taxed at each state's own rates (NaN for rows without a state
+    tax table, such as "United States").
+    """
+    by_category = index.state_prices * rpp_free_costs(i)
+    total = by_category.sum(axis=1)
+    order = np.argsort(total, kind="stable")
+
+    states = index.states
+    df = pd.DataFrame(by_category[order], columns=list(CATEGORIES))
+    df.insert(0, "rpp", [index.get(states[k]) for k in order])
+    df.insert(0, "state", [states[k] for k in order])
+    df.insert(0, "rank", np.arange(1, len(order) + 1))
+    df["Total"] = total[order]
+    if income_options is not None:
+        income = recommend_income_batch(df["Total"].to_numpy(), state=tax_states(df["state"]), **income_options)
+        gross = income["gross_annual"].to_numpy()
+        if income_options.get("effective_tax_rate") is None:
+            gross = np.where([has_tax_table(s) for s in df["state"]], gross, np.nan)
+        df["Gross annual needed"] = gross
+    return df
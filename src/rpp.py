@@ -1,10 +1,23 @@
 from __future__ import annotations
+import json
+import logging
+import weakref
+from bisect import bisect_left
+from io import StringIO
+from pathlib import Path
+import numpy as np
 import pandas as pd
-import requests
-import streamlit as st
+
+from src.cost_model import CATEGORIES, RppComponents, category_rpp
+from src.states import STATES, normalize_name
+
+log = logging.getLogger(__name__)
 
 BEA_RPP_URL = "https://www.bea.gov/data/prices-inflation/regional-price-parities-state-and-metro-area"
 
+# Bundled dataset written by `python -m src.rpp_ingest`
+RPP_DATA_PATH = Path(__file__).resolve().parent.parent / "data" / "rpp_states.json"
+
 # Minimal fallback if the BEA page format changes or offline
 FALLBACK_RPP = {
     "District of Columbia": 110.8,
@@ -16,35 +29,73 @@ FALLBACK_RPP = {
     "South Dakota": 88.1
 }
 
-@st.cache_data(ttl=24 * 3600)
-def load_rpp_table() -> pd.DataFrame:
+def parse_rpp_html(html: str) -> pd.DataFrame:
     """
-    Scrapes the BEA RPP page tables into DataFrames and returns the best match.
-    If scraping fails, returns a small fallback table.
+    Parses the BEA RPP page tables and returns the best match.
+    Raises ValueError if no table looks like a state RPP table.
     """
-    try:
-        html = requests.get(BEA_RPP_URL, timeout=20).text
-        tables = pd.read_html(html)
-
-        # Heuristic: find a table that contains 'State' and 'RPP' or similar numeric index
-        for t in tables:
-            cols = [str(c).lower() for c in t.columns]
-            if any("state" in c for c in cols) and (t.shape[0] >= 40):
-                # Normalize common column names
-                t = t.copy()
-                t.columns = [str(c).strip() for c in t.columns]
-                return t
-
-        # If nothing matched, raise to fallback
-        raise ValueError("No suitable RPP table found.")
-    except Exception:
-        # Fallback: create a small dataframe
-        return pd.DataFrame({"State": list(FALLBACK_RPP.keys()), "RPP": list(FALLBACK_RPP.values())})
-
-def get_state_rpp(df: pd.DataFrame, state_name: str) -> float:
+    tables = pd.read_html(StringIO(html))
+
+    # Heuristic: find a table that contains 'State' and 'RPP' or similar numeric index
+    for t in tables:
+        cols = [str(c).lower() for c in t.columns]
+        if any("state" in c for c in cols) and (t.shape[0] >= 40):
+            # Normalize common column names
+            t = t.copy()
+            t.columns = [str(c).strip() for c in t.columns]
+            return t
+
+    # If nothing matched, raise to fallback
+    raise ValueError("No suitable RPP table found.")
+
+def fallback_rpp_table() -> pd.DataFrame:
+    df = pd.DataFrame({"State": list(FALLBACK_RPP.keys()), "RPP": list(FALLBACK_RPP.values())})
+    df.attrs["version"] = "fallback"
+    return df
+
+def read_rpp_dataset(path: Path | str = RPP_DATA_PATH) -> pd.DataFrame:
+    """Reads a dataset written by src.rpp_ingest into a State/RPP table."""
+    data = json.loads(Path(path).read_text())
+    df = pd.DataFrame(data["states"], columns=["name", "rpp", "abbr", "fips", *COMPONENT_COLUMNS])
+    df.columns = ["State", "RPP", "Abbr", "FIPS", *(c.title() for c in COMPONENT_COLUMNS)]
+    df.attrs["version"] = data["version"]
+    return df
+
+def load_rpp_metros(path: Path | str = RPP_DATA_PATH) -> pd.DataFrame:
+    """Metro (MSA) RPPs from the bundled dataset; empty if it has none or does not exist."""
+    columns = ["cbsa", "name", "states", "rpp", *COMPONENT_COLUMNS]
+    if not Path(path).exists():
+        return pd.DataFrame(columns=columns)
+    metros = json.loads(Path(path).read_text()).get("metros", [])
+    return pd.DataFrame(metros, columns=columns)
+
+def load_rpp_table(path: Path | str = RPP_DATA_PATH) -> pd.DataFrame:
     """
-    Returns RPP value (index like 112.6). Tries multiple common column layouts.
+    Returns the RPP table from the bundled offline dataset. The first time no
+    dataset exists at the default path it is fetched once from BEA and written
+    there (see src.rpp_ingest.fetch_dataset); every later call reads the file
+    without network access. If that fetch fails, the small fallback table is
+    returned (attrs["version"] == "fallback"). A missing file at any other path
+    raises FileNotFoundError.
     """
+    path = Path(path)
+    if not path.exists():
+        if path != RPP_DATA_PATH:
+            raise FileNotFoundError(
+                f"No RPP dataset at {path}. Build it with `python -m src.rpp_ingest <BEA CSVs> --out {path}`."
+            )
+        from src.rpp_ingest import fetch_dataset  # imports this module
+
+        try:
+            fetch_dataset(path)
+        except Exception as e:  # offline, or the page changed: keep a working table
+            log.warning("No RPP dataset at %s and fetching it failed (%s); using the fallback table. "
+                        "Build one with `python -m src.rpp_ingest <BEA CSVs>`.", path, e)
+            return fallback_rpp_table()
+    return read_rpp_dataset(path)
+
+def rpp_columns(df: pd.DataFrame) -> tuple:
+    """Detects (state column, RPP column) in one of the common BEA table layouts."""
     # Standardize columns
     cols = {c.lower(): c for c in df.columns}
     state_col = None
@@ -67,17 +118,245 @@ def get_state_rpp(df: pd.DataFrame, state_name: str) -> float:
         raise ValueError("No numeric RPP column detected.")
 
     # Pick the first numeric column as best guess (BEA tables often have year columns)
-    rpp_col = numeric_cols[0]
-
-    match = df[df[state_col].astype(str).str.strip().str.lower() == state_name.strip().lower()]
-    if match.empty:
-        # Try contains-based match
-        match = df[df[state_col].astype(str).str.lower().str.contains(state_name.strip().lower(), na=False)]
-    if match.empty:
-        raise ValueError(f"State '{state_name}' not found in RPP table.")
-
-    val = float(pd.to_numeric(match.iloc[0][rpp_col], errors="coerce"))
-    if not (50.0 <= val <= 200.0):
-        # If parsing hit a weird number, fallback if present
-        return float(FALLBACK_RPP.get(state_name, 100.0))
-    return val
+    return state_col, numeric_cols[0]
+
+# Component columns, as written by src.rpp_ingest (lower-case in the metro table)
+COMPONENT_COLUMNS = ("goods", "housing", "utilities", "other")
+
+def _component_rows(df: pd.DataFrame, all_items: pd.Series) -> list:
+    """RppComponents per row; missing components fall back to the all-items value."""
+    cols = {str(c).lower(): c for c in df.columns}
+    parts = [
+        pd.to_numeric(df[cols[c]], errors="coerce").fillna(all_items) if c in cols else all_items
+        for c in COMPONENT_COLUMNS
+    ]
+    return [RppComponents(*map(float, row)) for row in zip(all_items, *parts)]
+
+def _valid_components(comps: RppComponents | None, all_items: float) -> RppComponents:
+    if comps is None or not all(50.0 <= v <= 200.0 for v in comps[1:]):
+        return RppComponents.uniform(all_items)
+    return comps._replace(all_items=all_items)
+
+# Price level used when neither the metro nor the state is known
+NATIONAL_RPP = 100.0
+
+class RppIndex:
+    """
+    Immutable RPP lookup, compiled once from the state (and optionally metro) tables.
+    State lookups accept names (case/whitespace-insensitive), USPS abbreviations
+    and FIPS codes; metro lookups accept MSA names and CBSA codes. All are dict hits.
+    """
+    __slots__ = (
+        "_by_key", "_names", "_components", "_metros", "_metro_keys", "_metro_sorted", "_metros_by_state",
+        "_state_prices",
+    )
+
+    def __init__(self, rpp_by_state: dict, metros=(), components: dict | None = None):
+        """
+        rpp_by_state maps state name -> all-items RPP; components optionally maps
+        state name -> RppComponents. metros are (CBSA code, name, state
+        abbreviations, rpp[, RppComponents]) tuples.
+        """
+        components = components or {}
+        by_key, names, comps = {}, {}, {}
+        for name, val in rpp_by_state.items():
+            key = normalize_name(name)
+            if not key or key in names:
+                continue
+            val = float(val)
+            if not (50.0 <= val <= 200.0):
+                # If parsing hit a weird number, fallback if present
+                val = float(FALLBACK_RPP.get(str(name).strip(), 100.0))
+            names[key] = (str(name).strip(), val)
+            by_key[key] = val
+            comps[key] = _valid_components(components.get(name), val)
+
+        # Aliases; a real table entry always wins over an alias
+        for fips, abbr, name in STATES:
+            hit = names.get(name.lower())
+            if hit is not None:
+                by_key.setdefault(fips, hit[1])
+                by_key.setdefault(abbr.lower(), hit[1])
+                comps.setdefault(fips, comps[name.lower()])
+                comps.setdefault(abbr.lower(), comps[name.lower()])
+
+        metro_by_cbsa, metro_keys, by_state = {}, {}, {}
+        for cbsa, name, states, val, *metro_comps in metros:
+            val = float(val)
+            if not (50.0 <= val <= 200.0):
+                continue
+            cbsa, name = str(cbsa), str(name).strip()
+            metro_by_cbsa[cbsa] = (name, val, tuple(states), _valid_components(metro_comps[0] if metro_comps else None, val))
+            metro_keys[normalize_name(name)] = cbsa
+            metro_keys[cbsa] = cbsa
+            for abbr in states:
+                by_state.setdefault(abbr.lower(), []).append(name)
+        metro_sorted = sorted((normalize_name(m[0]), cbsa) for cbsa, m in metro_by_cbsa.items())
+        # Every state key (FIPS, abbreviation, normalized name) -> its metro names
+        metros_by_state = {}
+        for fips, abbr, name in STATES:
+            in_state = tuple(sorted(by_state.get(abbr.lower(), ())))
+            if in_state:
+                metros_by_state.update(dict.fromkeys((fips, abbr.lower(), normalize_name(name)), in_state))
+        prices = np.array([category_rpp(comps[k]) for k in names], dtype=float).reshape(len(names), len(CATEGORIES))
+        prices.setflags(write=False)
+
+        for slot, value in zip(self.__slots__, (
+            by_key, names, comps, metro_by_cbsa, metro_keys, metro_sorted,
+            metros_by_state, prices,
+        )):
+            object.__setattr__(self, slot, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RppIndex is immutable")
+
+    @classmethod
+    def from_table(cls, df: pd.DataFrame, metros_df: pd.DataFrame | None = None) -> "RppIndex":
+        state_col, rpp_col = rpp_columns(df)
+        names = df[state_col].astype(str)
+        values = pd.to_numeric(df[rpp_col], errors="coerce")
+        components = dict(zip(names, _component_rows(df, values)))
+        metros = ()
+        if metros_df is not None and not metros_df.empty:
+            metros = zip(
+                metros_df["cbsa"], metros_df["name"], metros_df["states"], metros_df["rpp"],
+                _component_rows(metros_df, pd.to_numeric(metros_df["rpp"], errors="coerce")),
+            )
+        return cls(dict(zip(names, values)), metros, components)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, state) -> bool:
+        try:
+            self.get(state)
+        except ValueError:
+            return False
+        return True
+
+    def __getitem__(self, state) -> float:
+        return self.get(state)
+
+    def __getstate__(self):
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __setstate__(self, state):
+        for slot, value in zip(self.__slots__, state):
+            object.__setattr__(self, slot, value)
+
+    @property
+    def states(self) -> list:
+        """State names as they appear in the source table."""
+        return [name for name, _ in self._names.values()]
+
+    @property
+    def state_prices(self) -> np.ndarray:
+        """Read-only (len(states), len(CATEGORIES)) per-category price multipliers, in `states` order."""
+        return self._state_prices
+
+    def get(self, state) -> float:
+        key = f"{state:02d}" if isinstance(state, int) else normalize_name(state)
+        val = self._by_key.get(key)
+        if val is not None:
+            return val
+        # Rare path: contains-based match on table names
+        for norm, (_, v) in self._names.items():
+            if key and key in norm:
+                return v
+        raise ValueError(f"State '{state}' not found in RPP table.")
+
+    def components(self, state) -> RppComponents:
+        """Per-component parities for a state; all-items everywhere if the table has none."""
+        key = f"{state:02d}" if isinstance(state, int) else normalize_name(state)
+        comps = self._components.get(key)
+        return comps if comps is not None else RppComponents.uniform(self.get(state))
+
+    def resolve_components(self, state: str | None = None, metro: str | None = None) -> tuple:
+        """resolve(), but returning (RppComponents, level)."""
+        if metro:
+            cbsa = self._metro_keys.get(normalize_name(metro))
+            if cbsa is not None:
+                return self._metros[cbsa][3], "metro"
+        if state:
+            comps = self._components.get(normalize_name(state))
+            if comps is not None:
+                return comps, "state"
+        return RppComponents.uniform(NATIONAL_RPP), "national"
+
+    def resolve(self, state: str | None = None, metro: str | None = None) -> tuple:
+        """
+        Hierarchical lookup: metro, then state, then the national level.
+        Returns (rpp, level) with level one of "metro", "state", "national".
+        """
+        if metro:
+            cbsa = self._metro_keys.get(normalize_name(metro))
+            if cbsa is not None:
+                return self._metros[cbsa][1], "metro"
+        if state:
+            val = self._by_key.get(normalize_name(state))
+            if val is not None:
+                return val, "state"
+        return NATIONAL_RPP, "national"
+
+    def metros_in_state(self, state: str) -> tuple:
+        """Names of the metros that include any part of state (name, abbreviation or FIPS)."""
+        return self._metros_by_state.get(normalize_name(state), ())
+
+    def search_metros(self, prefix: str, state: str | None = None, limit: int = 20) -> list:
+        """Metro names starting with prefix (bisect over the sorted names), optionally within a state."""
+        key = normalize_name(prefix)
+        allowed = set(self.metros_in_state(state)) if state else None
+        out = []
+        for norm, cbsa in self._metro_sorted[bisect_left(self._metro_sorted, (key, "")):]:
+            if not norm.startswith(key) or len(out) >= limit:
+                break
+            name = self._metros[cbsa][0]
+            if allowed is None or name in allowed:
+                out.append(name)
+        return out
+
+def extract_states(df: pd.DataFrame) -> list[str]:
+    """Returns a sorted list of plausible state names from an RPP table ([] if none)."""
+    cols = {c.lower(): c for c in df.columns}
+    state_col = None
+    for k in cols:
+        if "state" in k:
+            state_col = cols[k]
+            break
+    if state_col is None:
+        return []
+    states = (
+        df[state_col]
+        .dropna()
+        .astype(str)
+        .str.strip()
+        .unique()
+        .tolist()
+    )
+    # Keep only plausible names
+    states = [s for s in states if len(s) >= 4 and s.lower() not in ("state",)]
+    return sorted(set(states))
+
+def build_rpp_index(df: pd.DataFrame, metros_df: pd.DataFrame | None = None) -> RppIndex:
+    return RppIndex.from_table(df, metros_df)
+
+# id(table) -> (weak reference to the table, its compiled RppIndex), for get_state_rpp
+_TABLE_INDEXES: dict[int, tuple] = {}
+
+def _table_index(df: pd.DataFrame) -> RppIndex:
+    """RppIndex.from_table(df), compiled once per table object (tables are treated as read-only)."""
+    hit = _TABLE_INDEXES.get(id(df))
+    if hit is not None and hit[0]() is df:
+        return hit[1]
+    index = RppIndex.from_table(df)
+    key = id(df)
+    _TABLE_INDEXES[key] = (weakref.ref(df, lambda _: _TABLE_INDEXES.pop(key, None)), index)
+    return index
+
+def get_state_rpp(df: pd.DataFrame | RppIndex, state_name: str) -> float:
+    """
+    Returns RPP value (index like 112.6). Tries multiple common column layouts.
+    A table is compiled into an RppIndex on its first call and reused while it
+    lives; pass an RppIndex (see build_rpp_index) to skip even that.
+    """
+    return (df if isinstance(df, RppIndex) else _table_index(df)).get(state_name)
@@ -0,0 +1,203 @@
+"""
+Converts a BEA Regional Price Parities download into the bundled dataset that
+load_rpp_table() reads at runtime.
+
+    python -m src.rpp_ingest SARPP_STATE_2008_2022.csv MARPP_MSA_2008_2022.csv
+    python -m src.rpp_ingest saved_rpp_page.html --version 2022
+    python -m src.rpp_ingest --fetch
+
+CSV input is a state (SARPP) or metro-area (MARPP) RPP table from BEA's
+interactive data download (GeoFips, GeoName, LineCode, Description, <year>...);
+pass both to get state and MSA parities in one dataset. HTML input is a saved
+copy of BEA_RPP_URL; --fetch downloads that page once. load_rpp_table() runs
+the same fetch by itself the first time it finds no dataset at the default
+path.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import re
+from datetime import date
+from io import StringIO
+from pathlib import Path
+import pandas as pd
+
+from src.rpp import BEA_RPP_URL, RPP_DATA_PATH, parse_rpp_html, rpp_columns
+from src.states import STATES, normalize_name
+
+def _year_columns(df: pd.DataFrame) -> list[str]:
+    return [c for c in df.columns if str(c).strip().isdigit() and len(str(c).strip()) == 4]
+
+# BEA RPP line codes -> dataset fields ("rpp" is all items; the rest are components)
+LINE_FIELDS = {1: "rpp", 2: "goods", 3: "housing", 4: "utilities", 5: "other"}
+
+def _round(values: dict) -> dict:
+    return {k: round(float(values[k]), 3) for k in LINE_FIELDS.values() if pd.notna(values.get(k))}
+
+def _metro_record(cbsa: str, geo_name: str, values: dict) -> dict | None:
+    # e.g. "Washington-Arlington-Alexandria, DC-VA-MD-WV (Metropolitan Statistical Area) *"
+    name = re.sub(r"\s*\(.*?\)|\s*\*+$", "", str(geo_name)).strip()
+    place, _, states = name.rpartition(", ")
+    abbrs = [a for a in states.split("-") if a in _ABBRS]
+    if not place or not abbrs or pd.isna(values.get("rpp")):
+        return None
+    return {"cbsa": cbsa, "name": name, "states": abbrs, **_round(values)}
+
+_ABBRS = {abbr for _, abbr, _ in STATES}
+
+def read_bea_csv(path: Path | str, year: str | None = None) -> tuple[dict[str, dict], list[dict], str]:
+    """
+    Returns ({state FIPS: {"rpp": all items, "goods": ..., ...}}, [metro records], year)
+    from a BEA state or metro-area RPP CSV. Uses the latest year column unless year is given.
+    """
+    df = pd.read_csv(path, dtype=str, encoding="latin-1")
+    df.columns = [str(c).strip() for c in df.columns]
+    years = _year_columns(df)
+    if not years:
+        raise ValueError("No year columns found in BEA CSV.")
+    year = year or max(years, key=int)
+    if year not in years:
+        raise ValueError(f"Year {year} not in BEA CSV (have {years[0]}-{years[-1]}).")
+
+    rows = pd.DataFrame({
+        "fips": df["GeoFips"].str.strip().str.strip('"'),
+        "name": df["GeoName"],
+        "field": pd.to_numeric(df["LineCode"], errors="coerce").map(LINE_FIELDS),
+        "value": pd.to_numeric(df[year], errors="coerce"),
+    })
+    rows = rows[rows["field"].notna() & rows["value"].notna() & rows["fips"].str.fullmatch(r"\d{5}")]
+    wide = rows.pivot_table(index="fips", columns="field", values="value", aggfunc="first")
+    names = rows.drop_duplicates("fips").set_index("fips")["name"]
+
+    # State rows are "SS000"; metro rows are CBSA codes (xx998/xx999 are metro/nonmetro portions)
+    fips = wide.index.to_series()
+    states = fips.str.endswith("000") & (fips != "00000")
+    metros = ~fips.str.endswith(("000", "998", "999"))
+    state_values = {f[:2]: _round(wide.loc[f].to_dict()) for f in fips[states]}
+    metro_records = [
+        rec for rec in (_metro_record(f, names[f], wide.loc[f].to_dict()) for f in fips[metros])
+        if rec is not None
+    ]
+    return {k: v for k, v in state_values.items() if "rpp" in v}, metro_records, year
+
+def read_bea_html(html: str) -> dict[str, dict]:
+    """
+    Returns {state FIPS: {"rpp": all items}} from the BEA RPP page (or a saved
+    copy of it). Rows match states by exact normalized name only; a state the
+    page lacks is left out rather than matched to a similar name (Kansas is
+    not Arkansas).
+    """
+    table = parse_rpp_html(html)
+    state_col, rpp_col = rpp_columns(table)
+    values = dict(zip(table[state_col].map(normalize_name), pd.to_numeric(table[rpp_col], errors="coerce")))
+    out = {}
+    for fips, _, name in STATES:
+        val = values.get(normalize_name(name))
+        if val is not None and 50.0 <= val <= 200.0:
+            out[fips] = {"rpp": float(val)}
+    return out
+
+def read_bea_metro_html(html: str) -> list[dict]:
+    """Metro records from the metro-area table of the BEA RPP page, if it has one."""
+    for t in pd.read_html(StringIO(html)):
+        cols = [str(c) for c in t.columns]
+        name_col = next((c for c in cols if "metro" in c.lower() or "area" in c.lower()), None)
+        if name_col is None or t.shape[0] < 100:
+            continue
+        t.columns = cols
+        rpp_col = next((c for c in cols if c != name_col and pd.to_numeric(t[c], errors="coerce").notna().mean() > 0.6), None)
+        if rpp_col is None:
+            continue
+        values = pd.to_numeric(t[rpp_col], errors="coerce")
+        # The page has no CBSA codes; key metros by name instead
+        records = (_metro_record(n, n, {"rpp": v}) for n, v in zip(t[name_col], values))
+        out = [r for r in records if r is not None]
+        for r in out:
+            r["cbsa"] = r["name"]
+        return out
+    return []
+
+def write_dataset(rpp_by_fips: dict[str, dict], version: str, source: str,
+                  path: Path | str = RPP_DATA_PATH, metros: list[dict] = ()) -> int:
+    """
+    Writes the dataset in FIPS order and returns the number of states written.
+    Each state's values hold "rpp" (all items) and any components BEA published.
+    """
+    states = [
+        {"fips": fips, "abbr": abbr, "name": name, **_round(rpp_by_fips[fips])}
+        for fips, abbr, name in STATES
+        if fips in rpp_by_fips
+    ]
+    if not states:
+        raise ValueError("No state RPP values found in input.")
+    data = {
+        "version": version,
+        "source": source,
+        "ingested": date.today().isoformat(),
+        "states": states,
+        "metros": sorted(metros, key=lambda m: m["name"]),
+    }
+    # Write beside the target and rename, so readers never see a partial file
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data, indent=2) + "\n")
+    os.replace(tmp, path)
+    return len(states)
+
+def fetch_dataset(path: Path | str = RPP_DATA_PATH, version: str | None = None,
+                  timeout: float = 20.0) -> tuple[int, int]:
+    """
+    Downloads BEA_RPP_URL once and writes it as the dataset (version defaults
+    to today's date); returns the number of states and metros written.
+    """
+    import requests
+
+    resp = requests.get(BEA_RPP_URL, timeout=timeout)
+    resp.raise_for_status()
+    metros = read_bea_metro_html(resp.text)
+    version = version or date.today().isoformat()
+    n = write_dataset(read_bea_html(resp.text), version, BEA_RPP_URL, path, metros)
+    return n, len(metros)
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("inputs", nargs="*", help="BEA CSV downloads (state and/or metro) or a saved RPP page (.html)")
+    parser.add_argument("--fetch", action="store_true", help=f"download {BEA_RPP_URL} instead")
+    parser.add_argument("--year", help="data year to take from a CSV (default: latest)")
+    parser.add_argument("--version", help="dataset version label (default: the data year)")
+    parser.add_argument("--out", default=str(RPP_DATA_PATH), help="output path")
+    args = parser.parse_args(argv)
+
+    if args.fetch:
+        n, n_metros = fetch_dataset(args.out, args.version)
+        print(f"Wrote {n} states and {n_metros} metros from {BEA_RPP_URL} to {args.out}")
+        return
+
+    values, metros, years, sources = {}, [], set(), []
+    if args.inputs:
+        for name in args.inputs:
+            src = Path(name)
+            if src.suffix.lower() in (".htm", ".html"):
+                html = src.read_text(encoding="utf-8", errors="replace")
+                values.update(read_bea_html(html))
+                metros += read_bea_metro_html(html)
+            else:
+                state_values, metro_records, year = read_bea_csv(src, args.year)
+                values.update(state_values)
+                metros += metro_records
+                years.add(year)
+            sources.append(src.name)
+    else:
+        parser.error("give input files or --fetch")
+
+    version = args.version or (max(years) if years else date.today().isoformat())
+    n = write_dataset(values, version, ", ".join(sources), args.out, metros)
+    missing = len(STATES) - n
+    print(
+        f"Wrote {n} states and {len(metros)} metros (version {version}) to {args.out}"
+        + (f"; {missing} states missing" if missing else "")
+    )
+
+if __name__ == "__main__":
+    main()
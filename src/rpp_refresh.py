@@ -0,0 +1,205 @@
+"""
+Background refresher for the live BEA RPP page.
+
+The last good table is kept in a shared store (src.rpp_store) and served
+(stale) while an asyncio task revalidates the page with If-None-Match /
+If-Modified-Since. A 304 only updates the check time; a 200 is parsed and
+published to the store. A failed check is retried with exponential backoff
+(from retry seconds, capped at interval). Readers never wait on the network:
+until the first fetch publishes they get the bundled dataset, or the static
+fallback table if none has been ingested.
+
+Every worker process may run a refresher: the fetch metadata lives on disk
+and the fetch itself runs under an exclusive file lock, so each refresh
+fetches once in total and every process picks up the result by mapping the
+same store file.
+
+    refresher = RppRefresher()
+    refresher.start_background()        # daemon thread running refresher.run()
+    df = refresher.table                # current table, never blocks on the network
+"""
+from __future__ import annotations
+import asyncio
+import contextlib
+import json
+import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Dict, Tuple
+
+import pandas as pd
+
+from src.rpp import BEA_RPP_URL, RPP_DATA_PATH, fallback_rpp_table, parse_rpp_html, read_rpp_dataset
+from src.rpp_store import SharedRppStore, write_atomic, publish_table
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, so each process may fetch
+    fcntl = None
+
+CACHE_DIR = Path(__file__).resolve().parent.parent / "data" / "cache"
+
+log = logging.getLogger(__name__)
+
+class RppRefresher:
+    """Serves the last good RPP table and revalidates it in the background."""
+
+    def __init__(self, url: str = BEA_RPP_URL, cache_dir: Path | str = CACHE_DIR,
+                 interval: float = 24 * 3600, timeout: float = 20.0, retry: float = 60.0,
+                 dataset_path: Path | str = RPP_DATA_PATH):
+        self.url = url
+        self.cache_dir = Path(cache_dir)
+        self.interval = interval
+        self.timeout = timeout
+        self.retry = retry
+        self.dataset_path = Path(dataset_path)
+        self.html_path = self.cache_dir / "rpp_page.html"
+        self.meta_path = self.cache_dir / "rpp_page.json"
+        self.lock_path = self.cache_dir / "rpp_page.lock"
+        self.store = SharedRppStore(self.cache_dir / "rpp_store")
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._fallback: pd.DataFrame | None = None
+        self._next_check = 0.0  # in-process copy, in case the metadata cannot be written
+
+    @property
+    def table(self) -> pd.DataFrame:
+        """
+        The newest published table; until the first fetch succeeds, the bundled
+        dataset (or the static fallback), read once and never from the network.
+        """
+        table = self.store.table()
+        if table is not None:
+            return table
+        if self._fallback is None:
+            self._fallback = (
+                read_rpp_dataset(self.dataset_path) if self.dataset_path.exists() else fallback_rpp_table()
+            )
+        return self._fallback
+
+    @property
+    def meta(self) -> Dict:
+        """Fetch metadata shared by every process (ETag, Last-Modified, fetched_at, checked_at, next_check)."""
+        try:
+            return json.loads(self.meta_path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def next_check(self) -> float:
+        """When the next check is due: after a failure the backoff, otherwise interval after the last check."""
+        meta = self.meta
+        due = meta.get("next_check", meta.get("checked_at", 0.0) + self.interval)
+        return max(due, self._next_check)
+
+    def is_stale(self) -> bool:
+        return time.time() >= self.next_check()
+
+    @contextlib.contextmanager
+    def _fetch_lock(self):
+        """Yields True if this process holds the cross-process fetch lock."""
+        if fcntl is None:
+            yield True
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False  # another process is fetching; its result lands in the store
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _fetch(self, meta: Dict) -> Tuple[int, bytes, Dict[str, str]]:
+        """Blocking conditional GET; returns (status, body, response headers)."""
+        headers = {"User-Agent": "cost-of-living-estimator"}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        req = urllib.request.Request(self.url, headers=headers)
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return resp.status, resp.read(), dict(resp.headers)
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return 304, b"", dict(e.headers)
+            raise
+
+    async def refresh(self) -> bool:
+        """
+        Revalidates once unless another process is already doing so or just
+        did. Returns True if a new table was published. Failures are logged
+        and leave the current (stale) table in place.
+        """
+        with self._lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+        try:
+            with self._fetch_lock() as acquired:
+                # Re-check under the lock: another process may have refreshed meanwhile
+                if not acquired or not self.is_stale():
+                    return False
+                meta = self.meta
+                try:
+                    return await self._revalidate(meta)
+                except Exception as e:
+                    failures = meta.get("failures", 0) + 1
+                    delay = min(self.retry * 2 ** (failures - 1), self.interval)
+                    log.warning("RPP refresh from %s failed; keeping the previous table, retrying in %.0fs: %s",
+                                self.url, delay, e)
+                    now = time.time()
+                    self._write_meta({**meta, "checked_at": now, "failures": failures, "next_check": now + delay})
+                    return False
+        finally:
+            self._refreshing = False
+
+    async def _revalidate(self, meta: Dict) -> bool:
+        # Conditional headers only make sense if the store still holds what they validated
+        status, body, headers = await asyncio.to_thread(self._fetch, meta if self.store.table() is not None else {})
+        now = time.time()
+        checked = {"checked_at": now, "failures": 0, "next_check": now + self.interval}
+        if status == 304:
+            self._write_meta({**meta, **checked})
+            return False
+
+        html = body.decode("utf-8", errors="replace")
+        table = await asyncio.to_thread(parse_rpp_html, html)
+        publish_table(table, f"live:{now:.0f}", self.store.store_dir)
+        write_atomic(self.html_path, body)
+        self._write_meta({
+            "url": self.url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched_at": now,
+            **checked,
+        })
+        return True
+
+    def _write_meta(self, meta: Dict) -> None:
+        self._next_check = meta["next_check"]
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            write_atomic(self.meta_path, json.dumps(meta, indent=2).encode())
+        except OSError as e:
+            log.warning("Could not write %s: %s", self.meta_path, e)
+
+    async def run(self) -> None:
+        """Refreshes whenever a check is due (see next_check); runs until cancelled."""
+        while True:
+            if self.is_stale():
+                await self.refresh()
+            # Short floor: another process may hold the fetch lock and publish any moment
+            await asyncio.sleep(max(self.next_check() - time.time(), 5.0))
+
+    def start_background(self) -> threading.Thread:
+        """Runs run() on its own event loop in a daemon thread (for sync callers such as Streamlit)."""
+        thread = threading.Thread(target=lambda: asyncio.run(self.run()), name="rpp-refresh", daemon=True)
+        thread.start()
+        return thread
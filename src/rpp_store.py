@@ -0,0 +1,117 @@
+"""
+Shared, read-only RPP store for multi-process deployments.
+
+The refresher publishes each new table as an immutable .npy file and then
+atomically swaps a small pointer file (CURRENT) to it. Every worker process
+memory-maps the file CURRENT names, so the data lives once in the OS page
+cache no matter how many workers map it, and readers never parse HTML or
+touch the network. The table's numeric columns are views of that mapping;
+each process still compiles its own RppIndex (a few small dicts) from it,
+once per published version.
+
+    publish_table(df, version)      # writer side (RppRefresher does this)
+    store = SharedRppStore()        # reader side, one per process
+    df = store.table()              # None until something has been published
+"""
+from __future__ import annotations
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from src.rpp import COMPONENT_COLUMNS, rpp_columns
+
+STORE_DIR = Path(__file__).resolve().parent.parent / "data" / "cache" / "rpp_store"
+POINTER = "CURRENT"
+
+# Published files kept besides the current one; older ones are unlinked (mapped copies stay valid)
+KEEP_OLD = 2
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Writes data to a temporary file beside path and renames it into place."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+def _to_records(df: pd.DataFrame) -> np.ndarray:
+    state_col, rpp_col = rpp_columns(df)
+    names = df[state_col].astype(str).str.strip().to_numpy()
+    width = max((len(n) for n in names), default=1)
+    fields = ["rpp", *COMPONENT_COLUMNS]
+    records = np.zeros(len(df), dtype=[("state", f"U{width}"), *((f, "f8") for f in fields)])
+    records["state"] = names
+    records["rpp"] = pd.to_numeric(df[rpp_col], errors="coerce").to_numpy(dtype=float)
+    cols = {str(c).lower(): c for c in df.columns}
+    for f in COMPONENT_COLUMNS:
+        records[f] = pd.to_numeric(df[cols[f]], errors="coerce").to_numpy(dtype=float) if f in cols else np.nan
+    return records
+
+def publish_table(df: pd.DataFrame, version: str, store_dir: Path | str = STORE_DIR) -> Path:
+    """Writes df as a new immutable store file and points CURRENT at it."""
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    path = store_dir / f"rpp-{time.time_ns()}.npy"
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, _to_records(df))
+    os.replace(tmp, path)
+    pointer = {"file": path.name, "version": version, "published": time.time()}
+    write_atomic(store_dir / POINTER, json.dumps(pointer).encode())
+
+    old = sorted(p for p in store_dir.glob("rpp-*.npy") if p != path)
+    for p in old[:-KEEP_OLD] if KEEP_OLD else old:
+        p.unlink(missing_ok=True)
+    return path
+
+class SharedRppStore:
+    """
+    Per-process reader. The pointer file is stat-ed at most every
+    check_interval seconds; the table is rebuilt only when it has changed.
+    """
+
+    def __init__(self, store_dir: Path | str = STORE_DIR, check_interval: float = 5.0):
+        self.store_dir = Path(store_dir)
+        self.check_interval = check_interval
+        self._checked = 0.0
+        # (pointer stamp, mapped records, table), swapped as one reference
+        self._current: tuple = (None, None, None)
+
+    def _refresh(self) -> None:
+        try:
+            st = (self.store_dir / POINTER).stat()
+        except FileNotFoundError:
+            return
+        stamp = (st.st_ino, st.st_mtime_ns)
+        if stamp == self._current[0]:
+            return
+        pointer = json.loads((self.store_dir / POINTER).read_text())
+        records = np.load(self.store_dir / pointer["file"], mmap_mode="r")
+        # The numeric columns are read-only views of the mapping (copy=False), not copies;
+        # only the few dozen state names are converted to Python strings
+        table = pd.DataFrame({
+            "State": records["state"].astype(object),
+            "RPP": records["rpp"],
+            **{f.title(): records[f] for f in COMPONENT_COLUMNS},
+        }, copy=False)
+        table.attrs["version"] = pointer["version"]
+        self._current = (stamp, records, table)
+
+    def table(self) -> Optional[pd.DataFrame]:
+        """The current shared table, or None if nothing has been published yet."""
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval or self._current[2] is None:
+            self._checked = now
+            try:
+                self._refresh()
+            except (OSError, ValueError, KeyError):
+                pass  # a half-cleaned store; keep serving the last good table
+        return self._current[2]
+
+    @property
+    def version(self) -> Optional[str]:
+        table = self.table()
+        return None if table is None else table.attrs["version"]
@@ -0,0 +1,217 @@
+"""
+Streams household files (CSV or Parquet) through the estimator in bounded memory.
+
+    python -m src.score households.csv -o scored.csv
+    python -m src.score households.parquet -o scored.parquet --chunk-size 250000
+
+Each chunk of rows is priced with estimate_batch and recommend_income_batch
+and appended to the output before the next chunk is read, so memory depends
+on --chunk-size, not on the file size. Rows are priced from an "rpp" column
+when the file has one, otherwise from "state" (and "metro", if present) via
+the RPP dataset, which is only loaded for files without one. The output is
+every input column followed by the category costs, "Total" and the income
+columns; it is written to a temporary file and renamed into place at the
+end. Parquet needs pyarrow, which also speeds up CSV output several times
+over.
+
+Income is grossed up through the tax brackets (src.tax) of each row's state
+(federal and payroll only where it has none) and its "filing_status" column,
+or --filing-status for files without one; --effective-tax-rate applies one
+flat rate instead.
+"""
+from __future__ import annotations
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+from src.batch import DEFAULT_INCOME, estimate_batch, recommend_income_batch
+from src.cost_model import RppComponents
+from src.linear import LinearModel
+from src.rpp import RPP_DATA_PATH, RppIndex, build_rpp_index, load_rpp_metros, load_rpp_table
+from src.tax import FILING_STATUSES, tax_states
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # CSV still works (through pandas, more slowly); Parquet does not
+    pa = pa_csv = pq = None
+
+CHUNK_SIZE = 100_000
+
+# Keep state/metro as text so FIPS codes such as "06" survive, and only blanks
+# as missing: "None" is a travel level, not NA
+CSV_OPTIONS = {"dtype": {"state": str, "metro": str}, "keep_default_na": False, "na_values": [""]}
+
+def _is_parquet(path: Path) -> bool:
+    return path.suffix.lower() in (".parquet", ".pq")
+
+def read_chunks(path: Path | str, chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Yields the file as DataFrames of at most chunk_size rows."""
+    path = Path(path)
+    if _is_parquet(path):
+        if pa is None:
+            raise ValueError("Reading Parquet needs pyarrow (pip install pyarrow).")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, **CSV_OPTIONS)
+
+def read_columns(path: Path | str) -> list:
+    """The file's column names, without reading its rows."""
+    path = Path(path)
+    if _is_parquet(path):
+        if pa is None:
+            raise ValueError("Reading Parquet needs pyarrow (pip install pyarrow).")
+        return pq.ParquetFile(path).schema_arrow.names
+    return list(pd.read_csv(path, nrows=0, **CSV_OPTIONS).columns)
+
+def resolve_rpp(chunk: pd.DataFrame, index: RppIndex) -> pd.DataFrame:
+    """Adds rpp and rpp_<component> columns from each row's state (and metro), looking up each distinct pair once."""
+    state = chunk["state"].fillna("").astype(str)
+    metro = chunk["metro"].fillna("").astype(str) if "metro" in chunk else pd.Series("", index=chunk.index)
+    codes, pairs = pd.factorize(pd.MultiIndex.from_arrays([state, metro]))
+    table = np.array([
+        index.resolve_components(s, m)[0] if m else index.components(s)
+        for s, m in pairs
+    ]).reshape(len(pairs), len(RppComponents._fields))
+    rows = table[codes]
+    chunk = chunk.copy()
+    chunk["rpp"] = rows[:, 0]
+    for j, name in enumerate(RppComponents._fields[1:], start=1):
+        chunk[f"rpp_{name}"] = rows[:, j]
+    return chunk
+
+def score_chunk(chunk: pd.DataFrame, index: RppIndex | None, income_options: Dict,
+                model: LinearModel | None = None) -> pd.DataFrame:
+    """The chunk's columns plus the monthly breakdown and recommend_income columns."""
+    if "rpp" not in chunk:
+        if index is None:
+            raise ValueError("The file has no 'rpp' column and no RPP dataset was loaded.")
+        chunk = resolve_rpp(chunk, index)
+    monthly = estimate_batch(chunk, model=model)
+    options = dict(income_options)
+    if "filing_status" in chunk:
+        options["filing_status"] = chunk["filing_status"].fillna(options["filing_status"]).to_numpy()
+    state = tax_states(chunk["state"]) if "state" in chunk else None
+    income = recommend_income_batch(monthly["Total"].to_numpy(), state=state, **options)
+    income.index = chunk.index
+    return pd.concat([chunk, monthly, income], axis=1)
+
+class _PandasCsvWriter:
+    def __init__(self, path: Path):
+        self.f = open(path, "w", newline="")
+        self.header = True
+
+    def write(self, df: pd.DataFrame) -> None:
+        df.to_csv(self.f, header=self.header, index=False)
+        self.header = False
+
+    def close(self) -> None:
+        self.f.close()
+
+class _ArrowWriter:
+    """Streams chunks into one CSV or Parquet file; much faster than DataFrame.to_csv."""
+
+    def __init__(self, path: Path, parquet: bool):
+        self.path = path
+        self.parquet = parquet
+        self.writer = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self.writer is None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            self.schema = table.schema
+            self.writer = (pq.ParquetWriter if self.parquet else pa_csv.CSVWriter)(str(self.path), self.schema)
+        else:
+            # Later chunks must match the first chunk's schema (e.g. an all-null column)
+            table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        self.writer.write_table(table)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+def _writer(path: Path, parquet: bool):
+    if pa is not None:
+        return _ArrowWriter(path, parquet)
+    if parquet:
+        raise ValueError("Writing Parquet needs pyarrow (pip install pyarrow).")
+    return _PandasCsvWriter(path)
+
+def write_scored(chunks: Iterable[pd.DataFrame], writer, index: RppIndex | None,
+                 income_options: Dict, model: LinearModel | None = None) -> int:
+    """Scores and writes each chunk in turn; returns the row count."""
+    rows = 0
+    for chunk in chunks:
+        try:
+            scored = score_chunk(chunk, index, income_options, model)
+        except ValueError as e:
+            raise ValueError(f"Rows {rows + 1}-{rows + len(chunk)}: {e}") from None
+        writer.write(scored)
+        rows += len(chunk)
+    return rows
+
+def score_file(src: Path | str, dst: Path | str, index: RppIndex | None = None,
+               chunk_size: int = CHUNK_SIZE, income_options: Dict | None = None) -> int:
+    """Scores src into dst chunk by chunk (format from each suffix) and returns the row count."""
+    dst = Path(dst)
+    income_options = {**DEFAULT_INCOME, **(income_options or {})}
+    tmp = dst.with_name(f".{dst.name}.{os.getpid()}.tmp")
+    writer = _writer(tmp, _is_parquet(dst))
+    try:
+        try:
+            rows = write_scored(read_chunks(src, chunk_size), writer, index, income_options)
+        finally:
+            writer.close()
+        if not tmp.exists():
+            raise ValueError(f"{src} has no rows.")
+        os.replace(tmp, dst)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return rows
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file of households in bounded memory.")
+    parser.add_argument("input", help="households, one Inputs field per column (.csv or .parquet)")
+    parser.add_argument("-o", "--output", required=True, help="scored output (.csv or .parquet)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows held in memory at a time")
+    parser.add_argument("--rpp-data", default=str(RPP_DATA_PATH), help="RPP dataset for rows without an 'rpp' column")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (0: one per core); see src.parallel")
+    parser.add_argument("--savings-rate", type=float, default=DEFAULT_INCOME["savings_rate"])
+    parser.add_argument("--buffer", type=float, default=DEFAULT_INCOME["buffer"])
+    parser.add_argument("--filing-status", choices=FILING_STATUSES, default=DEFAULT_INCOME["filing_status"],
+                        help="for rows without a filing_status column")
+    parser.add_argument("--effective-tax-rate", type=float, help="flat tax rate instead of the bracket tables")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    income_options = {name: getattr(args, name) for name in DEFAULT_INCOME}
+    if args.effective_tax_rate is not None:
+        income_options["effective_tax_rate"] = args.effective_tax_rate
+    try:
+        # Files with an rpp column never touch the RPP dataset
+        index = None
+        if "rpp" not in read_columns(args.input):
+            index = build_rpp_index(load_rpp_table(args.rpp_data), load_rpp_metros(args.rpp_data))
+        if args.workers == 1:
+            rows = score_file(args.input, args.output, index, args.chunk_size, income_options)
+        else:
+            from src.parallel import score_file_parallel
+            rows = score_file_parallel(
+                args.input, args.output, index, args.workers or None, args.chunk_size, income_options,
+            )
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    print(f"Scored {rows:,} households in {time.perf_counter() - start:.1f}s -> {args.output}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Sensitivity (tornado) analysis: which input or assumption moves the total most.
+
+Every Inputs field is swept over its alternatives (each other level, +/-1 for
+counts, the other value for booleans) and every basket coefficient and model
+constant is bumped by +/- pct. All variants are stacked into arrays and priced
+with a single category_costs call:
+
+    sensitivity(inputs, rpp_index=108.9).head()
+"""
+from __future__ import annotations
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from src.cost_model import (
+    CODES, LEVELS, MODEL_PARAMS, Inputs, ModelParams, RppComponents, category_costs,
+    category_rpp, coded_multipliers, load_base_basket,
+)
+
+# Count fields and the smallest value each may take
+COUNT_FIELDS = {"adults": 1, "kids": 0, "cars": 0}
+FLAG_FIELDS = ("premium_area", "gym")
+
+def _variants(i: Inputs, basket: Dict, pct: float) -> List[tuple]:
+    """(parameter, kind, label, field overrides, basket overrides, param overrides) per variant."""
+    out = [("(base)", "base", "", {}, {}, {})]
+    for field, levels in LEVELS.items():
+        out += [(field, "input", lv, {field: lv}, {}, {}) for lv in levels if lv != getattr(i, field)]
+    for field, lowest in COUNT_FIELDS.items():
+        v = getattr(i, field)
+        out += [(field, "input", str(n), {field: n}, {}, {}) for n in (v - 1, v + 1) if n >= lowest]
+    for field in FLAG_FIELDS:
+        v = not getattr(i, field)
+        out.append((field, "input", str(v), {field: v}, {}, {}))
+    for group, values in basket.items():
+        if not isinstance(values, dict):
+            continue
+        for key, v in values.items():
+            out += [(key, "basket", f"{f:+.0%}", {}, {(group, key): v * (1 + f)}, {}) for f in (-pct, pct)]
+    for name, v in MODEL_PARAMS._asdict().items():
+        out += [(name, "model", f"{f:+.0%}", {}, {}, {name: v * (1 + f)}) for f in (-pct, pct)]
+    return out
+
+def sensitivity(i: Inputs, rpp_index: float | RppComponents, pct: float = 0.10) -> pd.DataFrame:
+    """
+    One row per parameter, sorted by swing (high - low total), with columns
+    parameter, kind ("input", "basket" or "model"), low/high (change in the
+    monthly total vs. the base estimate; low <= 0 <= high), low_value and
+    high_value (the variant that produced each).
+    """
+    basket = load_base_basket()
+    variants = _variants(i, basket, pct)
+    n = len(variants)
+
+    fields = {f: np.full(n, getattr(i, f), dtype=object) for f in (*LEVELS, *COUNT_FIELDS, *FLAG_FIELDS)}
+    groups = {g: v for g, v in basket.items() if isinstance(v, dict)}
+    base = {g: {k: np.full(n, float(v)) for k, v in vals.items()} for g, vals in groups.items()}
+    params = {name: np.full(n, v) for name, v in MODEL_PARAMS._asdict().items()}
+    for row, (_, _, _, f_over, b_over, p_over) in enumerate(variants):
+        for f, v in f_over.items():
+            fields[f][row] = v
+        for (g, k), v in b_over.items():
+            base[g][k][row] = v
+        for name, v in p_over.items():
+            params[name][row] = v
+
+    m = coded_multipliers(
+        premium_area=fields["premium_area"].astype(bool).astype(np.int8),
+        **{f: np.array([CODES[f][v] for v in fields[f]]) for f in LEVELS},
+    )
+    costs = category_costs(
+        base, m,
+        extra_adults=np.maximum(fields["adults"].astype(float) - 1.0, 0.0),
+        kids=fields["kids"].astype(float), cars=fields["cars"].astype(float),
+        gym=fields["gym"].astype(bool), p=ModelParams(**params),
+    )
+    total = sum(np.broadcast_to(v, (n,)) * r for v, r in zip(costs, category_rpp(rpp_index)))
+    delta = total - total[0]
+
+    rows = pd.DataFrame({
+        "parameter": [v[0] for v in variants[1:]],
+        "kind": [v[1] for v in variants[1:]],
+        "value": [v[2] for v in variants[1:]],
+        "delta": delta[1:],
+    })
+    grouped = rows.groupby(["parameter", "kind"], sort=False)["delta"]
+    lo, hi = rows.loc[grouped.idxmin()], rows.loc[grouped.idxmax()]
+    out = pd.DataFrame({
+        "parameter": lo["parameter"].to_numpy(),
+        "kind": lo["kind"].to_numpy(),
+        "low": np.minimum(lo["delta"].to_numpy(), 0.0),
+        "high": np.maximum(hi["delta"].to_numpy(), 0.0),
+        "low_value": np.where(lo["delta"].to_numpy() < 0, lo["value"].to_numpy(), ""),
+        "high_value": np.where(hi["delta"].to_numpy() > 0, hi["value"].to_numpy(), ""),
+    })
+    out["swing"] = out["high"] - out["low"]
+    return out.sort_values("swing", ascending=False, kind="stable").reset_index(drop=True)
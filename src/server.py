@@ -0,0 +1,403 @@
+"""
+Headless JSON API for the estimator (stdlib asyncio, no web framework).
+
+    python -m src.server --host 127.0.0.1 --port 8080
+
+Endpoints:
+    GET  /health
+    GET  /states
+    GET  /metros?prefix=new&state=NY   (prefix search; state alone lists its metros)
+    POST /estimate        {"household": {<Inputs fields>}, "rpp": <optional>,
+                           "savings_rate": 0.15, "buffer": 0.05, "filing_status": "single",
+                           "effective_tax_rate": <optional flat rate>}
+    POST /estimate/batch  {"households": [{<Inputs fields>, "rpp": <optional>}, ...],
+                           "savings_rate": ..., "buffer": ..., "filing_status": ..., ...}
+    POST /rank            {"household": {<Inputs fields>}, "savings_rate": ..., ...}  (every state, cheapest first)
+    POST /sensitivity     {"household": {<Inputs fields>}, "rpp": <optional>, "pct": 0.10}
+    POST /affordable      {"gross_annual": 85000, "savings_rate": ..., "buffer": ..., "filing_status": ...,
+                           "adults": 1, "kids": 0, "states": <optional list>, "fixed": {<field>: <value>},
+                           "limit": 50}   (Pareto frontier per state, at most limit rows each)
+
+The RPP index and basket are loaded once at startup. A household's RPP is
+resolved from its optional "metro", then its "state", using BEA's per-category
+components where the dataset has them; "rpp" overrides both with a single
+all-items index. With --grid, /estimate answers from the precomputed scenario
+grid whenever the household size is inside it.
+
+Income is grossed up through the federal and state bracket tables (src.tax)
+for the household's state and "filing_status" (single, married_joint or
+head_of_household); an "effective_tax_rate" replaces them with one flat rate.
+A household whose state has no tax table (e.g. "United States", or any name
+with an explicit "rpp") pays federal and payroll taxes only.
+
+Without --grid, concurrent /estimate calls are micro-batched (src.microbatch):
+calls queued in the same event-loop iteration, or within --max-delay-ms of
+the first, up to --max-batch of them, are priced in one vectorized pass.
+Batched calls share the estimate cache reported by /health: hits are
+answered from it and only the misses are priced.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+from http import HTTPStatus
+from operator import attrgetter
+from urllib.parse import parse_qsl
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.affordability import affordable_lifestyles
+from src.batch import DEFAULT_INCOME, estimate_batch, recommend_income_batch
+from src.cost_model import (
+    CATEGORIES, INPUT_FIELDS, CostBreakdown, Inputs, RppComponents, cached_estimate, category_rpp,
+    estimate_cache_info, inputs_from_dict, load_base_basket, lookup_breakdown, recommend_income, store_breakdown,
+)
+from src.grid import ScenarioGrid
+from src.linear import linear_model
+from src.microbatch import MicroBatcher
+from src.ranking import rank_states
+from src.rpp import RppIndex, build_rpp_index, load_rpp_metros, load_rpp_table
+from src.sensitivity import sensitivity
+from src.tax import FILING_STATUSES, tax_state, tax_states
+
+MAX_BODY = 32 * 1024 * 1024
+
+class HttpError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+def _income_options(payload: Dict) -> Dict:
+    options = {"filing_status": payload.get("filing_status", DEFAULT_INCOME["filing_status"])}
+    if options["filing_status"] not in FILING_STATUSES:
+        raise ValueError(f"filing_status must be one of {list(FILING_STATUSES)}.")
+    try:
+        for k in ("savings_rate", "buffer"):
+            options[k] = float(payload.get(k, DEFAULT_INCOME[k]))
+        if payload.get("effective_tax_rate") is not None:
+            options["effective_tax_rate"] = float(payload["effective_tax_rate"])
+    except (TypeError, ValueError):
+        raise ValueError("savings_rate, buffer and effective_tax_rate must be numbers.") from None
+    return options
+
+_input_values = attrgetter(*INPUT_FIELDS)
+
+class EstimatorService:
+    """Request handlers; holds the RPP index loaded at startup."""
+
+    def __init__(self, rpp_index: RppIndex, version: str = "unknown", grid: ScenarioGrid | None = None):
+        self.rpp_index = rpp_index
+        self.version = version
+        self.grid = grid
+        load_base_basket()  # warm the basket cache
+
+    @classmethod
+    def from_bundled_data(cls, rpp_path: str | None = None, grid_path: str | None = None) -> "EstimatorService":
+        table = load_rpp_table(rpp_path) if rpp_path else load_rpp_table()
+        metros = load_rpp_metros(rpp_path) if rpp_path else load_rpp_metros()
+        grid = ScenarioGrid(grid_path) if grid_path else None
+        return cls(build_rpp_index(table, metros), table.attrs.get("version", "unknown"), grid)
+
+    def _rpp(self, household: Dict) -> RppComponents:
+        """An explicit "rpp" applies to every category; otherwise the metro's or state's components."""
+        if household.get("rpp") is not None:
+            try:
+                return RppComponents.uniform(float(household["rpp"]))
+            except (TypeError, ValueError):
+                raise ValueError(f"rpp must be a number, got {household['rpp']!r}.") from None
+        if household.get("metro"):
+            return self.rpp_index.resolve_components(household.get("state"), household["metro"])[0]
+        return self.rpp_index.components(household.get("state", ""))
+
+    def prepare_estimate(self, payload: Dict) -> Tuple[Inputs, RppComponents, Dict]:
+        """Validates an /estimate payload into (inputs, rpp, income options including the tax state)."""
+        household = payload.get("household")
+        if not isinstance(household, dict):
+            raise ValueError("Expected a 'household' object.")
+        inputs = inputs_from_dict(household)
+        rpp = self._rpp({**household, "rpp": payload.get("rpp", household.get("rpp"))})
+        return inputs, rpp, {**_income_options(payload), "state": tax_state(inputs.state)}
+
+    def estimate(self, payload: Dict) -> Dict:
+        inputs, rpp, income_options = self.prepare_estimate(payload)
+        if self.grid is not None and self.grid.covers(inputs):
+            monthly = self.grid.lookup(inputs, rpp)
+        else:
+            monthly = cached_estimate(inputs, rpp)
+        income = recommend_income(monthly["Total"], **income_options)
+        return {"rpp": rpp.all_items, "rpp_components": rpp._asdict(), "monthly": monthly, "income": income}
+
+    def estimate_many(self, requests: List[tuple]) -> List[Dict]:
+        """
+        estimate() for many prepare_estimate() results (the micro-batcher's flush):
+        households already in the estimate cache are answered from it, the rest
+        are priced in one vectorized pass and added to it, and incomes are
+        grossed up per distinct set of income options in one batch call each.
+        """
+        frozen = [i.freeze() for i, _, _ in requests]  # one cache key per row for lookup and store
+        breakdowns = [lookup_breakdown(f, rpp) for f, (_, rpp, _) in zip(frozen, requests)]
+        misses = [k for k, b in enumerate(breakdowns) if b is None]
+        if misses:
+            model = linear_model()
+            sizes = np.array([
+                (max(requests[k][0].adults - 1, 0), requests[k][0].kids, requests[k][0].cars) for k in misses
+            ], dtype=float)
+            costs = model.evaluate(np.array([model.combo(requests[k][0]) for k in misses]), *sizes.T)
+            prices = {rpp: category_rpp(rpp) for rpp in {requests[k][1] for k in misses}}
+            costs *= np.array([prices[requests[k][1]] for k in misses])
+            for k, row in zip(misses, costs.tolist()):
+                breakdowns[k] = CostBreakdown(*row, sum(row))
+                store_breakdown(frozen[k], requests[k][1], breakdowns[k])
+
+        totals = np.array([b.total for b in breakdowns])
+        incomes: List[Dict] = [None] * len(requests)
+        groups: Dict[tuple, List[int]] = {}
+        for k, (_, _, income_options) in enumerate(requests):
+            options = tuple(sorted((n, v) for n, v in income_options.items() if n != "state"))
+            groups.setdefault(options, []).append(k)
+        for options, rows in groups.items():
+            state = np.array([requests[k][2]["state"] for k in rows], dtype=object)
+            batch = recommend_income_batch(totals[rows], state=state, **dict(options))
+            for k, income in zip(rows, batch.to_dict(orient="records")):
+                incomes[k] = income
+
+        return [
+            {"rpp": rpp.all_items, "rpp_components": rpp._asdict(), "monthly": b.as_dict(), "income": income}
+            for (_, rpp, _), b, income in zip(requests, breakdowns, incomes)
+        ]
+
+    def estimate_batch(self, payload: Dict) -> Dict:
+        households = payload.get("households")
+        if not isinstance(households, list) or not households:
+            raise ValueError("Expected a non-empty 'households' list.")
+        # Validate every row and resolve its RPP before the vectorized pass, once per distinct household;
+        # the frame is built from the validated Inputs, so e.g. "adults": 2.5 is priced as 2 like /estimate
+        resolved = {}
+        rows: List[tuple] = []
+        rpp = np.empty((len(households), len(RppComponents._fields)))
+        for k, h in enumerate(households):
+            if not isinstance(h, dict):
+                raise ValueError(f"households[{k}] must be an object.")
+            try:
+                key = tuple(h.items())
+                hit = resolved.get(key)
+            except TypeError:  # unhashable values: resolve this row on its own
+                key = hit = None
+            if hit is None:
+                hit = (_input_values(inputs_from_dict(h)), self._rpp(h))
+                if key is not None:
+                    resolved[key] = hit
+            rows.append(hit[0])
+            rpp[k] = hit[1]
+        df = pd.DataFrame(rows, columns=INPUT_FIELDS)
+        df["rpp"] = rpp[:, 0]
+        for j, name in enumerate(RppComponents._fields[1:], start=1):
+            df[f"rpp_{name}"] = rpp[:, j]
+
+        monthly = estimate_batch(df)
+        income = recommend_income_batch(
+            monthly["Total"].to_numpy(), state=tax_states(df["state"]), **_income_options(payload),
+        )
+        return {
+            "count": len(df),
+            "dedup_ratio": monthly.attrs["dedup_ratio"],
+            "categories": [*CATEGORIES, "Total"],
+            "rpp": df["rpp"].tolist(),
+            "monthly": monthly.to_numpy().round(2).tolist(),
+            "income": income.to_dict(orient="records"),
+        }
+
+    def rank(self, payload: Dict) -> Dict:
+        household = payload.get("household")
+        if not isinstance(household, dict):
+            raise ValueError("Expected a 'household' object.")
+        ranking = rank_states(inputs_from_dict(household), self.rpp_index, _income_options(payload))
+        ranking = ranking.astype(object).where(ranking.notna(), None)  # no income figure -> null, not NaN
+        return {"version": self.version, "states": ranking.to_dict(orient="records")}
+
+    def sensitivity(self, payload: Dict) -> Dict:
+        household = payload.get("household")
+        if not isinstance(household, dict):
+            raise ValueError("Expected a 'household' object.")
+        inputs = inputs_from_dict(household)
+        rpp = self._rpp({**household, "rpp": payload.get("rpp", household.get("rpp"))})
+        ranked = sensitivity(inputs, rpp, float(payload.get("pct", 0.10)))
+        return {"rpp": rpp.all_items, "parameters": ranked.to_dict(orient="records")}
+
+    def affordable(self, payload: Dict) -> Dict:
+        try:
+            gross_annual = float(payload["gross_annual"])
+            adults, kids, limit = int(payload.get("adults", 1)), int(payload.get("kids", 0)), int(payload.get("limit", 50))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Expected a numeric 'gross_annual' and integer adults, kids and limit.") from None
+        states = payload.get("states")
+        if states is not None and not isinstance(states, list):
+            raise ValueError("'states' must be a list of state names.")
+        frontier = affordable_lifestyles(
+            self.rpp_index, gross_annual, adults=adults, kids=kids,
+            states=states, fixed=payload.get("fixed"), **_income_options(payload),
+        )
+        frontier = frontier.groupby("state", sort=False).head(limit)
+        return {"budget": frontier.attrs["budget"], "count": len(frontier), "lifestyles": frontier.to_dict(orient="records")}
+
+    def health(self) -> Dict:
+        cache = estimate_cache_info()
+        return {
+            "status": "ok",
+            "rpp_version": self.version,
+            "grid": self.grid is not None,
+            "estimate_cache": {"hits": cache.hits, "misses": cache.misses, "size": cache.currsize, "maxsize": cache.maxsize},
+        }
+
+    def states(self) -> Dict:
+        return {"version": self.version, "states": self.rpp_index.states}
+
+    def metros(self, query: Dict) -> Dict:
+        prefix, state = query.get("prefix", ""), query.get("state")
+        if prefix:
+            names = self.rpp_index.search_metros(prefix, state, limit=int(query.get("limit", 20)))
+        else:
+            names = list(self.rpp_index.metros_in_state(state)) if state else []
+        return {"metros": [{"name": n, "rpp": self.rpp_index.resolve(metro=n)[0]} for n in names]}
+
+class EstimatorServer:
+    """Minimal HTTP/1.1 server with keep-alive; each connection is a task."""
+
+    def __init__(self, service: EstimatorService, max_batch: int = 256, max_delay: float = 0.0):
+        self.service = service
+        # Concurrent /estimate calls are coalesced into one vectorized pass; grid lookups need no batching
+        self.batcher = (
+            MicroBatcher(service.estimate_many, max_batch, max_delay)
+            if max_batch > 1 and service.grid is None else None
+        )
+        self.routes = {
+            ("GET", "/health"): lambda _: {
+                **service.health(), "micro_batch": self.batcher.stats() if self.batcher is not None else None,
+            },
+            ("GET", "/states"): lambda _: service.states(),
+            ("GET", "/metros"): service.metros,
+            ("POST", "/estimate"): service.estimate,
+            ("POST", "/estimate/batch"): service.estimate_batch,
+            ("POST", "/rank"): service.rank,
+            ("POST", "/sensitivity"): service.sensitivity,
+            ("POST", "/affordable"): service.affordable,
+        }
+        # Batches can take a while; keep them off the event loop
+        self.offload = {("POST", "/estimate/batch"), ("POST", "/affordable")}
+
+    async def dispatch(self, method: str, target: str, body: bytes) -> Tuple[HTTPStatus, Dict]:
+        path, _, query = target.partition("?")
+        route = (method, path.rstrip("/") or "/")
+        handler = self.routes.get(route)
+        if handler is None:
+            if any(p == route[1] for _, p in self.routes):
+                raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on {route[1]}")
+            raise HttpError(HTTPStatus.NOT_FOUND, f"No route for {route[1]}")
+        try:
+            payload = json.loads(body) if body else dict(parse_qsl(query))
+        except json.JSONDecodeError as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Invalid JSON: {e}") from None
+        if not isinstance(payload, dict):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Expected a JSON object.")
+        try:
+            if route in self.offload:
+                result = await asyncio.get_running_loop().run_in_executor(None, handler, payload)
+            elif route == ("POST", "/estimate") and self.batcher is not None:
+                result = await self.batcher.submit(self.service.prepare_estimate(payload))
+            else:
+                result = handler(payload)
+        except ValueError as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, str(e)) from None
+        return HTTPStatus.OK, result
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                body = None  # stays None if the body was never read, so the stream position is unknown
+                try:
+                    raw_length = headers.get("content-length") or "0"
+                    if not (raw_length.isascii() and raw_length.isdigit()):
+                        raise HttpError(HTTPStatus.BAD_REQUEST, f"Invalid Content-Length: {raw_length!r}")
+                    length = int(raw_length)
+                    if length > MAX_BODY:
+                        raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large.")
+                    body = await reader.readexactly(length) if length else b""
+                    status, result = await self.dispatch(method.upper(), target, body)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    raise
+                except HttpError as e:
+                    status, result = e.status, {"error": str(e)}
+                    keep_alive = keep_alive and body is not None
+                except Exception as e:  # never let one request take the server down
+                    status, result = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(e).__name__}: {e}"}
+
+                data = json.dumps(result, default=_json_default).encode()
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+                    + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int) -> None:
+        server = await asyncio.start_server(self.handle, host, port)
+        addrs = ", ".join(str(s.getsockname()) for s in server.sockets)
+        print(f"Serving estimator API on {addrs}")
+        async with server:
+            await server.serve_forever()
+
+def _json_default(o):
+    if isinstance(o, np.generic):
+        return o.item()
+    raise TypeError(f"Not JSON serializable: {type(o).__name__}")
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve the cost-of-living estimator as a JSON API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--rpp-data", help="RPP dataset to load (default: the bundled one)")
+    parser.add_argument("--grid", help="serve /estimate from a grid built by `python -m src.grid build`")
+    parser.add_argument("--max-batch", type=int, default=256, help="most /estimate calls priced together (1: no batching)")
+    parser.add_argument("--max-delay-ms", type=float, default=0.0,
+                        help="how long a batch waits for more calls (0: only those already queued)")
+    args = parser.parse_args(argv)
+
+    try:
+        service = EstimatorService.from_bundled_data(args.rpp_data, args.grid)
+    except FileNotFoundError as e:  # an explicit --rpp-data that does not exist
+        parser.error(str(e))
+    server = EstimatorServer(service, args.max_batch, args.max_delay_ms / 1000)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Monte Carlo uncertainty bands for a household's monthly cost.
+
+Every basket coefficient, lifestyle multiplier and model constant (see
+ModelParams) is drawn around its point value, and all N draws go through
+category_costs in one NumPy pass:
+
+    bands = simulate(inputs, rpp_index=108.9, n=1_000_000)
+    bands.loc["Total", ["p10", "p50", "p90"]]
+
+Spreads are relative: Spread("lognormal", 0.10) multiplies the point value by
+exp(N(0, 0.10)); "normal" by N(1, scale) clipped at 0; "uniform" by
+U(1 - scale, 1 + scale). Parameters not named in `spreads` use `default`.
+"""
+from __future__ import annotations
+from typing import Dict, NamedTuple, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.cost_model import (
+    CATEGORIES, MODEL_PARAMS, Inputs, ModelParams, Multipliers, RppComponents,
+    category_costs, category_rpp, lifestyle_multipliers, load_base_basket,
+)
+
+class Spread(NamedTuple):
+    dist: str = "lognormal"   # "lognormal", "normal" or "uniform"
+    scale: float = 0.10       # sigma / relative sd / relative half-width
+
+DEFAULT_SPREAD = Spread()
+DISTRIBUTIONS = ("lognormal", "normal", "uniform")
+QUANTILES = (0.10, 0.50, 0.90)
+
+def parameter_names(basket: Dict | None = None) -> list[str]:
+    """Names accepted in `spreads`: basket keys, Multipliers fields and ModelParams fields."""
+    basket = basket or load_base_basket()
+    return [
+        *basket["monthly_usd_single_adult"], *basket["child_monthly"],
+        *Multipliers._fields, *ModelParams._fields,
+    ]
+
+def _sample(point: Sequence[float], spreads: Sequence[Spread], n: int, rng: np.random.Generator) -> list:
+    """
+    One float32 row of n draws per random parameter; fixed (or zero-valued)
+    parameters keep their scalar point value and broadcast in category_costs.
+    Each distribution is filled in place with a single generator call.
+    """
+    out = list(point)
+    for dist in DISTRIBUTIONS:
+        rows = [k for k, s in enumerate(spreads) if s.dist == dist and s.scale > 0 and point[k] != 0]
+        if not rows:
+            continue
+        block = np.empty((len(rows), n), dtype=np.float32)
+        scale = np.array([spreads[k].scale for k in rows], dtype=np.float32)[:, None]
+        if dist == "uniform":
+            rng.random(out=block, dtype=np.float32)
+            block *= 2.0 * scale
+            block += 1.0 - scale
+        else:
+            rng.standard_normal(out=block, dtype=np.float32)
+            block *= scale
+            if dist == "lognormal":
+                np.exp(block, out=block)
+            else:
+                block += 1.0
+                np.maximum(block, 0.0, out=block)
+        block *= np.array([point[k] for k in rows], dtype=np.float32)[:, None]
+        for k, row in zip(rows, block):
+            out[k] = row
+    return out
+
+def simulate(i: Inputs, rpp_index: float | RppComponents, n: int = 100_000,
+             spreads: Dict[str, Spread] | None = None, default: Spread = DEFAULT_SPREAD,
+             quantiles: Sequence[float] = QUANTILES, seed: int | None = None) -> pd.DataFrame:
+    """
+    Returns one row per category plus "Total", with columns "mean" and
+    "p10"/"p50"/"p90" (one per quantile). Household size and RPP stay fixed.
+    """
+    basket = load_base_basket()
+    names = parameter_names(basket)
+    spreads = spreads or {}
+    unknown = set(spreads) - set(names)
+    if unknown:
+        raise ValueError(f"Unknown parameter(s): {sorted(unknown)}; expected some of {names}")
+    for s in spreads.values():
+        if s.dist not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution {s.dist!r}; expected one of {DISTRIBUTIONS}")
+    spreads = {name: spreads.get(name, default) for name in names}
+
+    point = [
+        *basket["monthly_usd_single_adult"].values(), *basket["child_monthly"].values(),
+        *lifestyle_multipliers(i), *MODEL_PARAMS,
+    ]
+    rng = np.random.Generator(np.random.SFC64(seed))  # fastest bit generator for bulk normals
+    sampled = dict(zip(names, _sample(point, [spreads[name] for name in names], n, rng)))
+
+    single = basket["monthly_usd_single_adult"]
+    child = basket["child_monthly"]
+    costs = category_costs(
+        {
+            "monthly_usd_single_adult": {k: sampled[k] for k in single},
+            "child_monthly": {k: sampled[k] for k in child},
+        },
+        Multipliers(*(sampled[f] for f in Multipliers._fields)),
+        extra_adults=max(i.adults - 1, 0), kids=i.kids, cars=i.cars, gym=i.gym,
+        p=ModelParams(*(sampled[f] for f in ModelParams._fields)),
+    )
+
+    values = np.empty((len(CATEGORIES) + 1, n), dtype=np.float32)
+    for k, (v, r) in enumerate(zip(costs, category_rpp(rpp_index))):
+        values[k] = v * r  # scalar terms (e.g. childcare with no kids) broadcast
+    values[-1] = values[:-1].sum(axis=0)
+
+    q = np.quantile(values, quantiles, axis=1).T
+    df = pd.DataFrame(q, index=[*CATEGORIES, "Total"], columns=[f"p{round(x * 100):g}" for x in quantiles])
+    df.insert(0, "mean", values.mean(axis=1, dtype=np.float64))
+    return df.astype(float)
@@ -0,0 +1,201 @@
+"""
+Progressive tax on wage income: federal brackets and standard deduction by
+filing status, per-state brackets, FICA and state payroll taxes, all read
+from data/tax_tables_us.json.
+
+    gross_up(60_000, state="California", filing_status="married_joint")  # gross wages netting 60k
+    income_taxes(95_000, state="TX")                                      # federal/state/payroll split
+
+For one (state, filing status) the total tax is piecewise linear in gross
+wages, with a kink wherever a bracket starts (shifted by the deduction) or a
+wage base ends. Each pair compiles once into a TaxSchedule: the kinks, the
+tax at each and the marginal rate after it. Net income is then increasing
+and piecewise linear too, so gross_up is a binary search over the net income
+at the kinks plus one division: exact, and vectorized over whole arrays of
+households (one searchsorted per distinct state and filing status) instead
+of root finding row by row.
+"""
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Callable, Dict, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.states import STATES, normalize_name
+
+TAX_TABLES_PATH = Path(__file__).resolve().parent.parent / "data" / "tax_tables_us.json"
+
+FILING_STATUSES = ("single", "married_joint", "head_of_household")
+
+# Process-level caches: path -> parsed tables; (path, state, filing status) -> compiled schedule
+_TABLES_CACHE: Dict[str, Dict] = {}
+_SCHEDULES: Dict[Tuple[str, str, str], "TaxSchedule"] = {}
+
+# FIPS code, USPS abbreviation or name -> abbreviation
+_ABBR = {normalize_name(k): abbr for fips, abbr, name in STATES for k in (fips, abbr, name)}
+
+class TaxSchedule(NamedTuple):
+    """Total tax on annual gross wages, as linear pieces starting at each break."""
+    breaks: np.ndarray    # gross wages where a piece starts; breaks[0] == 0
+    tax: np.ndarray       # total tax at each break
+    marginal: np.ndarray  # total marginal rate from each break to the next
+
+    def tax_on(self, gross: np.ndarray) -> np.ndarray:
+        gross = np.maximum(gross, 0.0)
+        k = np.searchsorted(self.breaks, gross, side="right") - 1
+        return self.tax[k] + self.marginal[k] * (gross - self.breaks[k])
+
+    def gross_for(self, net: np.ndarray) -> np.ndarray:
+        """Inverse of gross - tax_on(gross); marginal rates are below 100%, so it is unique."""
+        net = np.maximum(net, 0.0)
+        net_at = self.breaks - self.tax
+        k = np.searchsorted(net_at, net, side="right") - 1
+        return self.breaks[k] + (net - net_at[k]) / (1.0 - self.marginal[k])
+
+def load_tax_tables(path: Path | str = TAX_TABLES_PATH) -> Dict:
+    """The parsed tax tables, read once per path."""
+    key = str(path)
+    if key not in _TABLES_CACHE:
+        _TABLES_CACHE[key] = json.loads(Path(key).read_text())
+    return _TABLES_CACHE[key]
+
+def state_abbr(state) -> str:
+    """USPS abbreviation for a state name, abbreviation or FIPS code; "" for no state."""
+    if state is None or (isinstance(state, float) and np.isnan(state)) or not str(state).strip():
+        return ""
+    try:
+        return _ABBR[normalize_name(state)]
+    except KeyError:
+        raise ValueError(f"No tax table for state {state!r}.") from None
+
+def has_tax_table(state) -> bool:
+    """Whether a name, abbreviation or FIPS code is a state (or DC) in the tax tables."""
+    try:
+        return state_abbr(state) != ""
+    except ValueError:
+        return False
+
+def tax_state(state) -> str:
+    """
+    state_abbr, but "" (federal and payroll taxes only) instead of an error
+    for places without a state table, such as a "United States" RPP row.
+    """
+    return state_abbr(state) if has_tax_table(state) else ""
+
+def tax_states(states) -> np.ndarray:
+    """tax_state over an array, resolving each distinct value once."""
+    codes, uniques = pd.factorize(np.asarray(states, dtype=object).ravel(), use_na_sentinel=False)
+    return np.array([tax_state(u) for u in uniques], dtype=object)[codes].reshape(np.shape(states))
+
+def _check_status(filing_status) -> str:
+    if filing_status not in FILING_STATUSES:
+        raise ValueError(f"filing_status must be one of {list(FILING_STATUSES)}, got {filing_status!r}")
+    return filing_status
+
+def _bracket_tax(taxable: np.ndarray, brackets: list) -> np.ndarray:
+    lo = np.array([b for b, _ in brackets], dtype=float)
+    rate = np.array([r for _, r in brackets], dtype=float)
+    width = np.append(np.diff(lo), np.inf)
+    return (np.clip(np.asarray(taxable, dtype=float)[..., None] - lo, 0.0, width) * rate).sum(axis=-1)
+
+def _state_table(tables: Dict, abbr: str, filing_status: str) -> Tuple[Dict | None, list]:
+    """(income tax schedule or None, payroll taxes) for a state; head_of_household falls back to single."""
+    table = tables["states"].get(abbr, {})
+    return table.get(filing_status, table.get("single")), table.get("payroll", [])
+
+def _components(gross: np.ndarray, abbr: str, filing_status: str, tables: Dict) -> Dict[str, np.ndarray]:
+    """Federal income tax, state income tax and payroll taxes on annual gross wages."""
+    gross = np.maximum(np.asarray(gross, dtype=float), 0.0)
+    federal = tables["federal"][filing_status]
+    state, payroll = _state_table(tables, abbr, filing_status)
+    fica = tables["fica"]
+    earners = fica["earners"][filing_status]  # wage bases apply per earner; wages split evenly
+
+    def capped(rate: float, wage_base: float | None) -> np.ndarray:
+        return rate * (gross if wage_base is None else np.minimum(gross, wage_base * earners))
+
+    out = {
+        "federal": _bracket_tax(gross - federal["deduction"], federal["brackets"]),
+        "state": _bracket_tax(gross - state["deduction"], state["brackets"]) if state else np.zeros_like(gross),
+        "payroll": (
+            capped(fica["social_security"]["rate"], fica["social_security"]["wage_base"])
+            + capped(fica["medicare"]["rate"], None)
+            + fica["additional_medicare"]["rate"]
+            * np.maximum(gross - fica["additional_medicare"]["threshold"][filing_status], 0.0)
+        ),
+    }
+    for p in payroll:
+        out["payroll"] = out["payroll"] + capped(p["rate"], p.get("wage_base"))
+    return out
+
+def compile_schedule(abbr: str, filing_status: str, tables: Dict) -> TaxSchedule:
+    federal = tables["federal"][filing_status]
+    state, payroll = _state_table(tables, abbr, filing_status)
+    fica = tables["fica"]
+    earners = fica["earners"][filing_status]
+    kinks = {0.0, fica["social_security"]["wage_base"] * earners,
+             fica["additional_medicare"]["threshold"][filing_status]}
+    for table in (federal, state):
+        if table:
+            kinks.update(table["deduction"] + lo for lo, _ in table["brackets"])
+    kinks.update(p["wage_base"] * earners for p in payroll if p.get("wage_base") is not None)
+
+    breaks = np.array(sorted(k for k in kinks if k >= 0.0), dtype=float)
+    at = np.append(breaks, breaks[-1] + 1e9)  # a point far past the last kink gives the top rate precisely
+    tax = sum(_components(at, abbr, filing_status, tables).values())
+    marginal = np.diff(tax) / np.diff(at)
+    return TaxSchedule(breaks, tax[:-1], marginal)
+
+def schedule(state=None, filing_status: str = "single", path: Path | str = TAX_TABLES_PATH) -> TaxSchedule:
+    """The compiled schedule for a state (None or "" for federal and FICA only) and filing status."""
+    key = (str(path), state_abbr(state), _check_status(filing_status))
+    hit = _SCHEDULES.get(key)
+    if hit is None:
+        hit = _SCHEDULES[key] = compile_schedule(key[1], key[2], load_tax_tables(path))
+    return hit
+
+def _per_schedule(fn: Callable[[TaxSchedule, np.ndarray], np.ndarray], x, state, filing_status,
+                  path: Path | str):
+    """Applies fn to x grouped by (state, filing status); each may be a scalar or an array."""
+    if np.ndim(state) == 0 and np.ndim(filing_status) == 0:
+        out = fn(schedule(state, filing_status, path), np.asarray(x, dtype=float))
+        return float(out) if np.ndim(out) == 0 else out
+    x = np.asarray(x, dtype=float)
+    shape = np.broadcast_shapes(x.shape, np.shape(state), np.shape(filing_status))
+    x = np.broadcast_to(x, shape).ravel()
+
+    def factorize(values) -> tuple:
+        if np.ndim(values) == 0:
+            return np.zeros(len(x), dtype=np.intp), [values]
+        return pd.factorize(np.broadcast_to(values, shape).ravel(), use_na_sentinel=False)
+
+    # Resolve each distinct state and status once, then one fn call per distinct pair
+    state_codes, states = factorize(state)
+    status_codes, statuses = factorize(filing_status)
+    pair = state_codes.astype(np.int64) * len(statuses) + status_codes
+    order = np.argsort(pair, kind="stable")
+    pairs, starts = np.unique(pair[order], return_index=True)
+    out = np.empty(len(x))
+    for p, rows in zip(pairs, np.split(order, starts[1:])):
+        out[rows] = fn(schedule(states[p // len(statuses)], statuses[p % len(statuses)], path), x[rows])
+    return out.reshape(shape)
+
+def tax_on(gross_annual, state=None, filing_status="single", path: Path | str = TAX_TABLES_PATH):
+    """Total annual tax (income + payroll) on gross wages; arguments may be scalars or arrays."""
+    return _per_schedule(TaxSchedule.tax_on, gross_annual, state, filing_status, path)
+
+def gross_up(net_annual, state=None, filing_status="single", path: Path | str = TAX_TABLES_PATH):
+    """Annual gross wages whose after-tax income is net_annual; arguments may be scalars or arrays."""
+    return _per_schedule(TaxSchedule.gross_for, net_annual, state, filing_status, path)
+
+def income_taxes(gross_annual: float, state=None, filing_status: str = "single",
+                 path: Path | str = TAX_TABLES_PATH) -> Dict[str, float]:
+    """Annual federal, state and payroll tax on one gross wage, their total and the effective rate."""
+    out = {k: float(v) for k, v in _components(
+        gross_annual, state_abbr(state), _check_status(filing_status), load_tax_tables(path),
+    ).items()}
+    out["total"] = sum(out.values())
+    out["effective_rate"] = out["total"] / gross_annual if gross_annual > 0 else 0.0
+    return out
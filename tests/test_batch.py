@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.cost_model as cost_model
+from src.batch import estimate_batch, unique_rows
+from src.cost_model import (
+    CATEGORIES, LEVELS, Inputs, RppComponents, cached_breakdown, clear_estimate_cache, estimate_cache_info,
+    estimate_monthly_cost, lookup_breakdown, store_breakdown,
+)
+
+COMPONENTS = RppComponents._fields[1:]
+
+def _households(n: int, seed: int = 0, components: bool = False) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({f: rng.choice(levels, n) for f, levels in LEVELS.items()})
+    df["state"] = "Ohio"
+    df["adults"] = rng.integers(1, 5, n)
+    df["kids"] = rng.integers(0, 4, n)
+    df["cars"] = rng.integers(0, 3, n)
+    df["premium_area"] = rng.integers(0, 2, n).astype(bool)
+    df["gym"] = rng.integers(0, 2, n).astype(bool)
+    df["rpp"] = rng.uniform(80.0, 120.0, n).round(1)
+    if components:
+        for name in COMPONENTS:
+            df[f"rpp_{name}"] = rng.uniform(70.0, 140.0, n).round(1)
+    return df
+
+def _inputs(row) -> Inputs:
+    return Inputs(**{f: row[f] for f in cost_model.INPUT_FIELDS})
+
+@pytest.mark.parametrize("components", [False, True])
+def test_batch_matches_scalar(components):
+    df = _households(500, seed=1, components=components)
+    batch = estimate_batch(df)
+    assert list(batch.columns) == [*CATEGORIES, "Total"]
+    for k, row in df.iterrows():
+        rpp = (
+            RppComponents(row["rpp"], *(row[f"rpp_{c}"] for c in COMPONENTS)) if components else row["rpp"]
+        )
+        expected = estimate_monthly_cost(_inputs(row), rpp)
+        np.testing.assert_allclose(batch.loc[k].to_numpy(), [expected[c] for c in batch.columns], rtol=1e-9)
+
+def test_batch_accepts_codes_and_rejects_bad_flags():
+    df = _households(50, seed=2)
+    coded = df.copy()
+    for f, levels in LEVELS.items():
+        coded[f] = df[f].map({v: k for k, v in enumerate(levels)})
+    coded["gym"] = df["gym"].astype(int)
+    pd.testing.assert_frame_equal(estimate_batch(coded), estimate_batch(df))
+
+    for bad in (np.nan, "no", 2):
+        broken = df.astype({"premium_area": object})
+        broken.loc[3, "premium_area"] = bad
+        with pytest.raises(ValueError, match="premium_area"):
+            estimate_batch(broken)
+
+def test_dedup_preserves_order_and_reports_ratio():
+    distinct = _households(40, seed=3, components=True)
+    rng = np.random.default_rng(4)
+    picks = rng.integers(0, len(distinct), 1_000)
+    df = distinct.iloc[picks].reset_index(drop=True)
+    out = estimate_batch(df)
+    once = estimate_batch(distinct)
+    np.testing.assert_array_equal(out.to_numpy(), once.to_numpy()[picks])
+    n_unique = len(np.unique(picks))
+    assert out.attrs["unique_rows"] == n_unique
+    assert out.attrs["dedup_ratio"] == pytest.approx(1_000 / n_unique)
+
+def test_unique_rows_first_occurrences():
+    a = np.array([3, 1, 3, 2, 1, 3])
+    b = np.array([0.5, 0.5, 0.5, 0.5, 0.5, 0.7])
+    first, inverse = unique_rows(a, b)
+    assert first.tolist() == [0, 1, 3, 5]
+    assert inverse.tolist() == [0, 1, 0, 2, 1, 3]
+
+def test_estimate_cache_hits_and_evictions(monkeypatch):
+    monkeypatch.setattr(cost_model._ESTIMATE_CACHE, "maxsize", 3)
+    clear_estimate_cache()
+    rows = [_inputs(row) for _, row in _households(4, seed=5).iterrows()]
+    try:
+        first = cached_breakdown(rows[0], 100.0)
+        assert cached_breakdown(rows[0], 100) is first  # an int rpp keys the same entry
+        assert cached_breakdown(rows[0].freeze(), 100.0) is first
+        info = estimate_cache_info()
+        assert (info.hits, info.misses, info.currsize) == (2, 1, 1)
+
+        for i in rows[1:]:
+            cached_breakdown(i, 100.0)
+        assert estimate_cache_info().currsize == 3
+        assert lookup_breakdown(rows[0], 100.0) is None  # least recently used, evicted
+        assert lookup_breakdown(rows[3], 100.0) is not None
+
+        store_breakdown(rows[0], 105.0, first)
+        assert lookup_breakdown(rows[0], 105.0) is first
+        assert lookup_breakdown(rows[1], 100.0) is None  # evicted by the store
+        info = estimate_cache_info()
+        assert (info.hits, info.misses, info.currsize, info.maxsize) == (4, 6, 3, 3)
+    finally:
+        clear_estimate_cache()
@@ -0,0 +1,106 @@
+import asyncio
+import http.server
+import threading
+import types
+
+import pandas as pd
+import pytest
+
+import src.rpp_refresh as rpp_refresh
+from src.rpp_refresh import RppRefresher
+from src.states import STATES
+
+ETAG, LAST_MODIFIED = '"v1"', "Wed, 01 Oct 2025 00:00:00 GMT"
+
+PAGE = pd.DataFrame({
+    "State": [name for _, _, name in STATES],
+    "RPP": [90.0 + k * 0.5 for k in range(len(STATES))],
+}).to_html(index=False).encode()
+
+class StandIn(http.server.BaseHTTPRequestHandler):
+    """Local stand-in for the BEA page: answers with the next queued status."""
+    statuses: list = []
+    requests: list = []
+
+    def do_GET(self):
+        type(self).requests.append(dict(self.headers))
+        status = type(self).statuses.pop(0)
+        self.send_response(status)
+        if status == 200:
+            self.send_header("ETag", ETAG)
+            self.send_header("Last-Modified", LAST_MODIFIED)
+            self.send_header("Content-Length", str(len(PAGE)))
+            self.end_headers()
+            self.wfile.write(PAGE)
+        else:
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stand_in():
+    StandIn.statuses, StandIn.requests = [], []
+    server = http.server.HTTPServer(("127.0.0.1", 0), StandIn)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/rpp"
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replaces the refresher's wall clock with one the test advances."""
+    now = types.SimpleNamespace(t=1_000_000.0)
+    monkeypatch.setattr(rpp_refresh, "time", types.SimpleNamespace(time=lambda: now.t))
+    return now
+
+def _refresher(url, tmp_path):
+    return RppRefresher(url=url, cache_dir=tmp_path / "cache", interval=3600.0, timeout=5.0, retry=60.0,
+                        dataset_path=tmp_path / "missing.json")
+
+def test_200_publishes_the_table(stand_in, tmp_path, clock):
+    r = _refresher(stand_in, tmp_path)
+    assert r.table.attrs["version"] == "fallback" and r.is_stale()
+    StandIn.statuses = [200]
+    assert asyncio.run(r.refresh())
+    assert r.table.attrs["version"].startswith("live:") and len(r.table) == len(STATES)
+    assert r.meta["etag"] == ETAG and r.meta["last_modified"] == LAST_MODIFIED
+    assert r.next_check() == clock.t + 3600.0 and not r.is_stale()
+    assert "If-None-Match" not in StandIn.requests[0]
+
+def test_304_keeps_the_validated_copy(stand_in, tmp_path, clock):
+    r = _refresher(stand_in, tmp_path)
+    StandIn.statuses = [200, 304]
+    asyncio.run(r.refresh())
+    version = r.table.attrs["version"]
+
+    clock.t += 3600.0
+    assert r.is_stale()
+    assert not asyncio.run(r.refresh())
+    sent = StandIn.requests[1]
+    assert sent["If-None-Match"] == ETAG and sent["If-Modified-Since"] == LAST_MODIFIED
+    assert r.table.attrs["version"] == version
+    assert r.meta["etag"] == ETAG and r.meta["checked_at"] == clock.t
+    assert r.next_check() == clock.t + 3600.0
+
+def test_5xx_keeps_the_stale_table_and_backs_off(stand_in, tmp_path, clock):
+    r = _refresher(stand_in, tmp_path)
+    StandIn.statuses = [200, 503, 503, 500, 200]
+    asyncio.run(r.refresh())
+    version = r.table.attrs["version"]
+
+    clock.t += 3600.0
+    for failures, delay in ((1, 60.0), (2, 120.0), (3, 240.0)):
+        assert not asyncio.run(r.refresh())
+        assert r.table.attrs["version"] == version
+        assert r.meta["failures"] == failures
+        assert r.next_check() == clock.t + delay
+        assert not asyncio.run(r.refresh())  # not due yet: no request is made
+        clock.t += delay
+    assert len(StandIn.requests) == 4
+
+    # A success resets the backoff
+    assert asyncio.run(r.refresh())
+    assert r.meta["failures"] == 0 and r.next_check() == clock.t + 3600.0
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.affordability import affordable_lifestyles
+from src.batch import recommend_income_batch
+from src.cost_model import Inputs, affordable_monthly_cost, recommend_income
+from src.ranking import rank_states
+from src.rpp import build_rpp_index
+from src.states import STATES
+from src.tax import (
+    FILING_STATUSES, gross_up, has_tax_table, income_taxes, load_tax_tables, schedule, state_abbr,
+    tax_on, tax_state, tax_states,
+)
+
+ALL_PAIRS = [(abbr, fs) for _, abbr, _ in STATES for fs in FILING_STATUSES]
+
+def _bisect_gross(net: np.ndarray, state: str, filing_status: str) -> np.ndarray:
+    """Reference inverse: plain bisection on the per-component tax."""
+    lo, hi = np.zeros_like(net), np.full_like(net, 1e8)
+    for _ in range(100):
+        mid = (lo + hi) / 2
+        below = mid - sum(income_taxes_vec(mid, state, filing_status)) < net
+        lo, hi = np.where(below, mid, lo), np.where(below, hi, mid)
+    return lo
+
+def income_taxes_vec(gross: np.ndarray, state: str, filing_status: str) -> list:
+    rows = [income_taxes(g, state, filing_status) for g in gross]
+    return [np.array([r[k] for r in rows]) for k in ("federal", "state", "payroll")]
+
+def test_federal_brackets_by_hand():
+    # Single, 50k wages in Texas: taxable 35,400 -> 1,160 + 12% of 23,800; FICA 7.65%
+    t = income_taxes(50_000, "Texas")
+    assert t["federal"] == pytest.approx(1_160 + 0.12 * 23_800)
+    assert t["state"] == 0.0
+    assert t["payroll"] == pytest.approx(50_000 * 0.0765)
+
+def test_wage_base_and_additional_medicare():
+    t = income_taxes(300_000, "FL")
+    assert t["payroll"] == pytest.approx(0.062 * 168_600 + 0.0145 * 300_000 + 0.009 * 100_000)
+    # Married couples: wage base per earner, additional Medicare over 250k combined
+    t = income_taxes(300_000, "FL", "married_joint")
+    assert t["payroll"] == pytest.approx(0.062 * 300_000 + 0.0145 * 300_000 + 0.009 * 50_000)
+
+def test_state_brackets_and_payroll():
+    # California single at 100k: taxable 94,460 across the 1%..9.3% brackets, plus 1.1% SDI
+    brackets = load_tax_tables()["states"]["CA"]["single"]["brackets"]
+    taxable, expected = 100_000 - 5_540, 0.0
+    for (lo, rate), (hi, _) in zip(brackets, brackets[1:] + [[np.inf, 0]]):
+        expected += rate * max(min(taxable, hi) - lo, 0.0)
+    t = income_taxes(100_000, "CA")
+    assert t["state"] == pytest.approx(expected)
+    assert t["payroll"] == pytest.approx(100_000 * (0.0765 + 0.011))
+
+@pytest.mark.parametrize("state,filing_status", ALL_PAIRS)
+def test_schedule_matches_components(state, filing_status):
+    gross = np.array([0.0, 1.0, 9_999.0, 55_000.0, 180_000.0, 2.5e6, 3e7])
+    ref = sum(income_taxes_vec(gross, state, filing_status))
+    np.testing.assert_allclose(schedule(state, filing_status).tax_on(gross), ref, rtol=1e-12, atol=1e-6)
+
+@pytest.mark.parametrize("state,filing_status", ALL_PAIRS[::7])
+def test_gross_up_matches_bisection(state, filing_status):
+    net = np.array([0.0, 500.0, 12_000.0, 48_000.0, 95_000.0, 260_000.0, 1.2e6])
+    np.testing.assert_allclose(gross_up(net, state, filing_status), _bisect_gross(net, state, filing_status),
+                               rtol=0, atol=1e-5)
+
+def test_gross_up_inverts_tax_on_for_mixed_arrays():
+    rng = np.random.default_rng(0)
+    n = 5_000
+    states = rng.choice([name for _, _, name in STATES], n)
+    statuses = rng.choice(FILING_STATUSES, n)
+    net = rng.uniform(0.0, 500_000.0, n)
+    gross = gross_up(net, states, statuses)
+    np.testing.assert_allclose(gross - tax_on(gross, states, statuses), net, rtol=1e-12, atol=1e-6)
+    for k in rng.integers(0, n, 50):
+        assert gross_up(net[k], states[k], statuses[k]) == pytest.approx(gross[k], rel=1e-12)
+
+def test_marginal_rates_below_one():
+    for state, filing_status in ALL_PAIRS:
+        s = schedule(state, filing_status)
+        assert (s.marginal < 1.0).all() and (np.diff(s.breaks - s.tax) > 0).all()
+
+def test_state_resolution():
+    assert state_abbr("California") == state_abbr("ca") == state_abbr("06") == "CA"
+    assert state_abbr("") == state_abbr(None) == ""
+    with pytest.raises(ValueError):
+        state_abbr("United States")
+    assert not has_tax_table("United States") and has_tax_table("Texas")
+    assert tax_state("United States") == "" and tax_state("New York") == "NY"
+    assert list(tax_states(np.array(["Ohio", "United States", np.nan], dtype=object))) == ["OH", "", ""]
+    with pytest.raises(ValueError):
+        gross_up(10_000.0, "Texas", "joint")
+
+def test_recommend_income_round_trip():
+    ri = recommend_income(6_000.0, 0.15, buffer=0.05, state="CA", filing_status="married_joint")
+    assert affordable_monthly_cost(ri["gross_annual"], 0.15, None, 0.05, "CA", "married_joint") == pytest.approx(6_000.0)
+    batch = recommend_income_batch([6_000.0, 6_000.0], 0.15, buffer=0.05, state=["CA", "TX"],
+                                   filing_status="married_joint")
+    assert batch["gross_annual"][0] == pytest.approx(ri["gross_annual"])
+    assert batch["gross_annual"][1] < batch["gross_annual"][0]
+    # A flat rate keeps the old closed form
+    flat = recommend_income(6_500.0, 0.15, 0.22, 0.05)
+    assert flat["gross_monthly"] == pytest.approx(6_500.0 * 1.05 / 0.85 / 0.78)
+
+def _index_with_national_row():
+    table = pd.DataFrame({
+        "State": ["United States", *(name for _, _, name in STATES)],
+        "RPP": [100.0, *np.linspace(85.0, 115.0, len(STATES))],
+    })
+    return build_rpp_index(table)
+
+SAMPLE = Inputs(
+    state="Texas", adults=2, kids=1, housing_mode="Rent", bedrooms="2BR", premium_area=False, cars=1,
+    transit="Medium", groceries="Standard", dining_out="Medium", insurance="Standard", gym=True,
+    entertainment="Medium", travel="Occasional",
+)
+
+def test_rank_and_affordability_skip_places_without_tax_table():
+    index = _index_with_national_row()
+    options = {"savings_rate": 0.15, "buffer": 0.05, "filing_status": "single"}
+    ranking = rank_states(SAMPLE, index, options).set_index("state")
+    assert np.isnan(ranking.loc["United States", "Gross annual needed"])
+    assert ranking.drop(index="United States")["Gross annual needed"].notna().all()
+
+    frontier = affordable_lifestyles(index, 95_000, 0.15, adults=2, kids=1)
+    assert "United States" not in set(frontier["state"])
+    assert "United States" not in frontier.attrs["budget"]